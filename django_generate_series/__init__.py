@@ -1 +1,7 @@
+import django
+
 __version__ = "0.2.1"
+
+if django.VERSION < (3, 2):
+    # Later versions find the AppConfig of apps.py on their own
+    default_app_config = "django_generate_series.apps.DjangoGenerateSeriesConfig"
@@ -0,0 +1,57 @@
+from typing import Union
+
+from django.db import models
+from django.db.models import Aggregate, Expression, Value
+
+# Ordered-set aggregates take their direct arguments (e.g. the fraction) before WITHIN GROUP, and the expression
+#   to be ordered inside it, so the arguments are joined with `arg_joiner`, which closes the first and opens the
+#   second. They are computed per bucket with annotate_buckets or annotate_histogram, but partial results cannot
+#   be combined, so they do not support `cumulative=True` or `parallel`.
+
+
+class _OrderedSetAggregate(Aggregate):
+    def _resolve_output_field(self):
+        # The result has the type of the ordered expression, rather than of the fraction
+        return self.source_expressions[-1].output_field
+
+
+class _Percentile(_OrderedSetAggregate):
+    template = "%(function)s(%(expressions)s)"
+    arg_joiner = ") WITHIN GROUP (ORDER BY "
+
+    def __init__(self, expression: Union[str, Expression], fraction: float, **extra):
+        if not 0 <= fraction <= 1:
+            raise ValueError("The fraction must be between 0 and 1")
+        super().__init__(Value(fraction, output_field=models.FloatField()), expression, **extra)
+
+
+class PercentileCont(_Percentile):
+    """
+    Returns the value at `fraction` (between 0 and 1) of the ordered values of `expression`, interpolating
+        between the nearest values (e.g. PercentileCont("duration", 0.95) for the 95th percentile)
+
+    Returns a float, unless another output_field is provided (e.g. DurationField for intervals).
+    """
+
+    function = "percentile_cont"
+    output_field = models.FloatField()
+
+
+class PercentileDisc(_Percentile):
+    """
+    Returns the first of the ordered values of `expression` whose position is at least `fraction` (between 0 and 1)
+
+    Unlike PercentileCont, the result is always one of the values, with the same type.
+    """
+
+    function = "percentile_disc"
+
+
+class Mode(_OrderedSetAggregate):
+    """Returns the most frequent value of `expression`, the smallest one in case of ties"""
+
+    function = "mode"
+    template = "%(function)s() WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression: Union[str, Expression], **extra):
+        super().__init__(expression, **extra)
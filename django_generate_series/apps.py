@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class DjangoGenerateSeriesConfig(AppConfig):
     name = "django_generate_series"
+
+    def ready(self):
+        from django_generate_series.cache import connect_receivers
+
+        connect_receivers()
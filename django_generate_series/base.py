@@ -61,3 +61,13 @@ class NoEffectManager(models.Manager):
     delete = _warn_no_effect
     as_manager = _warn_no_effect
     explain = _warn_no_effect
+
+
+class ReadOnlyQuerySet(models.QuerySet):
+    create = _warn_no_effect
+    get_or_create = _warn_no_effect
+    update_or_create = _warn_no_effect
+    bulk_create = _warn_no_effect
+    bulk_update = _warn_no_effect
+    update = _warn_no_effect
+    delete = _warn_no_effect
@@ -0,0 +1,107 @@
+"""
+Invalidation of the results of series cached with `GenerateSeriesQuerySet.cached`
+
+Cached results are keyed by a version of each model which the query reads. The versions are stored in the caches
+    themselves, so that every process sharing a cache (e.g.: several web workers and Celery workers using Redis or
+    memcached) sees the same versions. The receivers which change the version of a model when its instances are saved
+    or deleted are connected when the app is ready, in every process, so that changes made in processes which never
+    read cached results (e.g.: the admin) invalidate them too. They are only connected to the models listed in the
+    settings, so that projects which do not cache series pay nothing on saves.
+
+Settings:
+    GENERATE_SERIES_CACHES: the aliases of the caches used with `cached`. Defaults to ("default",)
+    GENERATE_SERIES_CACHED_MODELS: the labels of the models which cached queries may read (e.g.: ["core.Order"]).
+        Defaults to None, in which case no receiver is connected, and no series reading another model can be cached
+"""
+import time
+from typing import Set, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.db.models.sql import Query
+
+CACHE_KEY_PREFIX = "django_generate_series"
+
+# The models whose versions are changed by the receivers (see connect_receivers)
+_watched_models: Set[Type[models.Model]] = set()
+
+
+def get_cache_aliases() -> Tuple[str, ...]:
+    return tuple(getattr(settings, "GENERATE_SERIES_CACHES", ("default",)))
+
+
+def _get_query_models(query: Query) -> set:
+    """Returns the models read by `query`: its model, joined models, and the models of subqueries in annotations"""
+    models_read = {query.model, *getattr(query, "_series_dependencies", ())}
+    for join in query.alias_map.values():
+        join_field = getattr(join, "join_field", None)
+        if join_field is not None:
+            models_read.update((join_field.model, join_field.related_model))
+
+    expressions = list(query.annotations.values())
+    while expressions:
+        expression = expressions.pop()
+        if isinstance(expression, Query):
+            models_read |= _get_query_models(expression)
+            continue
+        if isinstance(getattr(expression, "query", None), Query):
+            models_read |= _get_query_models(expression.query)
+        expressions.extend(item for item in expression.get_source_expressions() if item is not None)
+
+    return {model for model in models_read if model is not None and not model._meta.abstract}
+
+
+def _get_version_key(model: Type[models.Model]) -> str:
+    return f"{CACHE_KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def _get_model_versions(cache, dependencies: set) -> tuple:
+    """Returns the current version of each model, sorted by model label"""
+    keys = sorted(_get_version_key(model) for model in dependencies)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A missing version may have been evicted, so start from a new value rather than from 0
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return tuple((key, versions[key]) for key in keys)
+
+
+def _check_invalidation(using: str, dependencies: set):
+    """Raises ImproperlyConfigured if changes to `dependencies` would not invalidate results cached in `using`"""
+    if using not in get_cache_aliases():
+        raise ImproperlyConfigured(
+            f"Cached series must use one of the caches of the GENERATE_SERIES_CACHES setting, not {using!r}"
+        )
+    unwatched = sorted(model._meta.label for model in dependencies - _watched_models)
+    if unwatched:
+        raise ImproperlyConfigured(
+            f"Add {', '.join(unwatched)} to the GENERATE_SERIES_CACHED_MODELS setting to cache series reading them"
+        )
+
+
+def _bump_model_version(sender, **kwargs):
+    """Changes the version of `sender`, invalidating the cached results which read it"""
+    key = _get_version_key(sender)
+    for using in get_cache_aliases():
+        try:
+            caches[using].incr(key)
+        except ValueError:
+            caches[using].set(key, time.time_ns(), None)
+
+
+def connect_receivers():
+    """Connects the receivers which change the version of models when their instances are saved or deleted"""
+    global _watched_models
+
+    labels = getattr(settings, "GENERATE_SERIES_CACHED_MODELS", None) or ()
+    _watched_models = {apps.get_model(label) for label in labels}
+    for model in _watched_models:
+        for signal in (post_save, post_delete):
+            signal.connect(
+                _bump_model_version, sender=model, dispatch_uid=f"{CACHE_KEY_PREFIX}:{model._meta.label_lower}"
+            )
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+from typing import Union
+
+from django.db import models
+from django.db.models import ExpressionWrapper, Func, Value
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Cast, Floor
+
+try:
+    from django.db.models.functions import Random
+except ImportError:  # Django < 3.2
+
+    class Random(Func):
+        function = "RANDOM"
+        arity = 0
+        output_field = models.FloatField()
+
+
+# Each expression calls random() in the database, so a new value is computed for each row (e.g.: when inserting
+#   fixtures with create_fixtures). They are composed of Django's expressions and arithmetic, wrapped to set the
+#   type of the result, except for RandomChoice, as Django cannot index an array of values.
+
+
+class RandomInteger(ExpressionWrapper):
+    """
+    Returns a random integer between `low` and `high` (both included)
+
+    Mirrors `random.randint`.
+    """
+
+    def __init__(self, low: int, high: int):
+        if not low <= high:
+            raise ValueError("The low value must not be larger than the high value")
+        span = Value(float(high - low + 1), output_field=models.FloatField())
+        super().__init__(
+            Value(low, output_field=models.BigIntegerField())
+            + Cast(Floor(Random() * span), output_field=models.BigIntegerField()),
+            output_field=models.BigIntegerField(),
+        )
+
+
+class RandomChoice(Func):
+    """Returns one of `choices` at random"""
+
+    template = "(ARRAY[%(expressions)s])[floor(random() * %(count)s)::integer + 1]"
+
+    def __init__(self, *choices, output_field: models.Field = None, **extra):
+        if not choices:
+            raise ValueError("At least one choice must be provided")
+        super().__init__(
+            *(Value(choice, output_field=output_field) for choice in choices),
+            count=len(choices),
+            output_field=output_field,
+            **extra,
+        )
+
+
+class RandomDateTime(ExpressionWrapper):
+    """
+    Given a min_date value and an optional timedelta, returns a random datetime within the resulting span
+
+    Mirrors `get_random_datetime` of the example project's random_utils.
+    """
+
+    def __init__(self, min_date: datetime, max_timedelta: timedelta = timedelta(days=10)):
+        if not max_timedelta > timedelta(0):
+            raise ValueError("If a timedelta value is provided, it must be positive")
+        offset = CombinedExpression(
+            Random(),
+            "*",
+            Value(max_timedelta, output_field=models.DurationField()),
+            output_field=models.DurationField(),
+        )
+        super().__init__(
+            Value(min_date, output_field=models.DateTimeField()) + offset, output_field=models.DateTimeField()
+        )
+
+
+class RandomDate(ExpressionWrapper):
+    """
+    Given a min_date value and an optional timedelta, returns a random date within the resulting span
+
+    Mirrors `get_random_date` of the example project's random_utils.
+    """
+
+    def __init__(self, min_date: Union[date, datetime], max_timedelta: timedelta = timedelta(days=10)):
+        if not max_timedelta > timedelta(0):
+            raise ValueError("If a timedelta value is provided, it must be positive")
+        if isinstance(min_date, datetime):
+            min_date = min_date.date()
+        days = Value(float(max(max_timedelta.days, 1)), output_field=models.FloatField())
+        # date + integer is a date in Postgres
+        super().__init__(
+            CombinedExpression(
+                Value(min_date, output_field=models.DateField()),
+                "+",
+                Cast(Floor(Random() * days), output_field=models.IntegerField()),
+                output_field=models.DateField(),
+            ),
+            output_field=models.DateField(),
+        )
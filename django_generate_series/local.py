@@ -0,0 +1,251 @@
+"""
+Sequences computed locally, without querying the database (e.g.: for pre-computing bucket edges)
+
+The sequences match those of the get_*_sequence functions in the example project's sequence_utils. The *_array
+    functions compute a whole sequence at once with NumPy arithmetic (datetime64 and scaled int64 values), with
+    the *_range_array functions returning (lower, upper) pairs, and the get_*_sequence generators stream Python
+    values one at a time.
+
+Aware datetimes are computed in UTC, as Postgres does with the UTC connections used by Django, and datetime64
+    arrays hold naive UTC values (as with `as_arrays(as_numpy=True)`). Across a DST change, steps therefore keep
+    their length in UTC, whereas sequence_utils adds them to the wall time of start_datetime. NumPy is only
+    required for the arrays.
+"""
+import datetime
+import decimal
+from typing import Iterator, NamedTuple, Optional, Tuple, Union
+
+
+class ScaledDecimals(NamedTuple):
+    """Decimals held as int64 values scaled by 10 ** places, so that their arithmetic is exact"""
+
+    values: "numpy.ndarray"
+    places: int
+
+    def to_decimals(self) -> list:
+        """Returns the values as decimals, or as (lower, upper) tuples of decimals for ranges"""
+        if self.values.ndim == 2:
+            return [tuple(self._to_decimal(value) for value in pair) for pair in self.values]
+        return [self._to_decimal(value) for value in self.values]
+
+    def _to_decimal(self, value) -> decimal.Decimal:
+        return decimal.Decimal(int(value)).scaleb(-self.places)
+
+
+def _datetime_count(start_datetime, step, end_datetime, num_steps) -> int:
+    if not step > datetime.timedelta(0):
+        raise ValueError("The step must be positive")
+    if end_datetime is not None:
+        if not start_datetime < end_datetime:
+            raise ValueError("If an end_datetime is provided, it must be greater than start_datetime")
+        # The end is excluded, so round the number of steps up
+        return -(-(end_datetime - start_datetime) // step)
+    if num_steps < 0:
+        raise ValueError("If a num_steps value is provided, it must be positive")
+    return int(num_steps)
+
+
+def _to_datetime64(numpy, value: datetime.datetime) -> "numpy.datetime64":
+    if value.utcoffset() is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return numpy.datetime64(value, "us")
+
+
+def datetime_array(
+    start_datetime: datetime.datetime,
+    step: datetime.timedelta = datetime.timedelta(days=1),
+    end_datetime: Optional[datetime.datetime] = None,
+    num_steps: int = 10,
+) -> "numpy.ndarray":
+    """
+    Returns a datetime64[us] array of datetimes from start_datetime, in increments of step, up to end_datetime
+        (excluded) or over the number of steps
+    """
+    import numpy
+
+    count = _datetime_count(start_datetime, step, end_datetime, num_steps)
+    return _to_datetime64(numpy, start_datetime) + numpy.arange(count, dtype="int64") * _to_timedelta64(numpy, step)
+
+
+def _to_timedelta64(numpy, step: datetime.timedelta) -> "numpy.timedelta64":
+    return numpy.timedelta64(step // datetime.timedelta(microseconds=1), "us")
+
+
+def date_array(*args, **kwargs) -> "numpy.ndarray":
+    """
+    Returns a datetime64[D] array of dates
+
+    Takes same arguments as datetime_array
+    """
+    return datetime_array(*args, **kwargs).astype("datetime64[D]")
+
+
+def datetime_range_array(
+    start_datetime: datetime.datetime, step: datetime.timedelta = datetime.timedelta(days=1), *args, **kwargs
+) -> "numpy.ndarray":
+    """
+    Returns a datetime64[us] array of the (lower, upper) pairs of datetime ranges, each spanning one step
+
+    Takes same arguments as datetime_array
+    """
+    import numpy
+
+    lower = datetime_array(start_datetime, step, *args, **kwargs)
+    return numpy.stack([lower, lower + _to_timedelta64(numpy, step)], axis=1)
+
+
+def date_range_array(
+    start_datetime: datetime.datetime, step: datetime.timedelta = datetime.timedelta(days=1), *args, **kwargs
+) -> "numpy.ndarray":
+    """
+    Returns a datetime64[D] array of the (lower, upper) pairs of date ranges, each spanning the whole days of one step
+
+    Takes same arguments as date_array
+    """
+    import numpy
+
+    lower = date_array(start_datetime, step, *args, **kwargs)
+    return numpy.stack([lower, lower + numpy.timedelta64(step.days, "D")], axis=1)
+
+
+def _scale(*values) -> int:
+    """Returns the number of decimal places needed to hold all of the values as integers"""
+    return max(max(-decimal.Decimal(value).as_tuple().exponent, 0) for value in values if value is not None)
+
+
+def _decimal_sequence(start, step, end, num_steps) -> Tuple[int, int, int, int]:
+    """Returns the scaled start and step, the number of values, and the number of decimal places of a sequence"""
+    if not step > 0:
+        raise ValueError("The step must be positive")
+    places = _scale(start, step, end)
+    scaled_start, scaled_step = (int(decimal.Decimal(value).scaleb(places)) for value in (start, step))
+
+    if end is not None:
+        if not start < end:
+            raise ValueError("If an end_value is provided, it must be greater than start")
+        count = (int(decimal.Decimal(end).scaleb(places)) - scaled_start) // scaled_step + 1
+    else:
+        if num_steps < 0:
+            raise ValueError("If a num_steps value is provided, it must be positive")
+        count = int(num_steps)
+
+    return scaled_start, scaled_step, count, places
+
+
+def decimal_array(
+    start: decimal.Decimal = decimal.Decimal("0.00"),
+    step: Union[decimal.Decimal, int] = decimal.Decimal("1.00"),
+    end: Optional[decimal.Decimal] = None,
+    num_steps: int = 10,
+) -> ScaledDecimals:
+    """
+    Returns the decimals from start, in increments of step, up to end (included) or over the number of steps,
+        as int64 values scaled by 10 ** places
+    """
+    import numpy
+
+    scaled_start, scaled_step, count, places = _decimal_sequence(start, step, end, num_steps)
+    return ScaledDecimals(scaled_start + numpy.arange(count, dtype="int64") * scaled_step, places)
+
+
+def decimal_range_array(
+    start: decimal.Decimal = decimal.Decimal("0.00"),
+    step: Union[decimal.Decimal, int] = decimal.Decimal("1.00"),
+    *args,
+    **kwargs,
+) -> ScaledDecimals:
+    """
+    Returns the (lower, upper) pairs of decimal ranges, each spanning one step, as int64 values scaled by
+        10 ** places
+
+    Takes same arguments as decimal_array
+    """
+    import numpy
+
+    lower = decimal_array(start, step, *args, **kwargs)
+    scaled_step = int(decimal.Decimal(step).scaleb(lower.places))
+    return ScaledDecimals(numpy.stack([lower.values, lower.values + scaled_step], axis=1), lower.places)
+
+
+def get_datetime_sequence(
+    start_datetime: datetime.datetime,
+    step: datetime.timedelta = datetime.timedelta(days=1),
+    end_datetime: Optional[datetime.datetime] = None,
+    num_steps: int = 10,
+    strip_time: bool = False,
+) -> Iterator[Union[datetime.datetime, datetime.date]]:
+    """
+    Generates a sequence of datetimes from start_datetime to either end_datetime (excluded) or over the number
+        of steps, in the timezone of start_datetime
+
+    strip_time: if True, dates are generated instead
+    """
+    count = _datetime_count(start_datetime, step, end_datetime, num_steps)
+    tzinfo = start_datetime.tzinfo if start_datetime.utcoffset() is not None else None
+    # Only convert each value when the timezone of start_datetime is not UTC already
+    convert = tzinfo is not None and tzinfo is not datetime.timezone.utc
+    value = start_datetime.astimezone(datetime.timezone.utc) if convert else start_datetime
+
+    for _ in range(count):
+        result = value.astimezone(tzinfo) if convert else value
+        yield result.date() if strip_time else result
+        value += step
+
+
+def get_date_sequence(*args, **kwargs) -> Iterator[datetime.date]:
+    """
+    Generates a sequence of dates
+
+    Takes same arguments as get_datetime_sequence
+    """
+    return get_datetime_sequence(*args, **{**kwargs, "strip_time": True})
+
+
+def get_datetime_range_sequence(
+    start_datetime: datetime.datetime, step: datetime.timedelta = datetime.timedelta(days=1), *args, **kwargs
+) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Generates a sequence of datetime ranges, each spanning one step
+
+    Takes same arguments as get_datetime_sequence
+    """
+    return ((value, value + step) for value in get_datetime_sequence(start_datetime, step, *args, **kwargs))
+
+
+def get_date_range_sequence(
+    start_datetime: datetime.datetime, step: datetime.timedelta = datetime.timedelta(days=1), *args, **kwargs
+) -> Iterator[Tuple[datetime.date, datetime.date]]:
+    """
+    Generates a sequence of date ranges, each spanning one step
+
+    Takes same arguments as get_date_sequence
+    """
+    return ((value, value + step) for value in get_date_sequence(start_datetime, step, *args, **kwargs))
+
+
+def get_decimal_sequence(
+    start: decimal.Decimal = decimal.Decimal("0.00"),
+    step: Union[decimal.Decimal, int] = decimal.Decimal("1.00"),
+    end: Optional[decimal.Decimal] = None,
+    num_steps: int = 10,
+) -> Iterator[decimal.Decimal]:
+    """Generates a sequence of decimals from start to either end (included) or over the number of steps"""
+    _, _, count, _ = _decimal_sequence(start, step, end, num_steps)
+    value = start
+    for _ in range(count):
+        yield value
+        value += step
+
+
+def get_decimal_range_sequence(
+    start: decimal.Decimal = decimal.Decimal("0.00"),
+    step: Union[decimal.Decimal, int] = decimal.Decimal("1.00"),
+    *args,
+    **kwargs,
+) -> Iterator[Tuple[decimal.Decimal, decimal.Decimal]]:
+    """
+    Generates a sequence of decimal ranges, each spanning one step
+
+    Takes same arguments as get_decimal_sequence
+    """
+    return ((value, value + step) for value in get_decimal_sequence(start, step, *args, **kwargs))
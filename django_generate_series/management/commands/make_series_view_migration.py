@@ -0,0 +1,74 @@
+import os
+import re
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, migrations
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from django_generate_series.models import AbstractSeriesView
+from django_generate_series.operations import CreateSeriesView
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a migration which creates (or re-creates) the materialized view of a series view (a subclass of "
+        "AbstractSeriesView), from the current definition of the model"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", metavar="app_label.ModelName", help="The view to create")
+        parser.add_argument("--name", help="The name of the migration")
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS, help="The database whose connection compiles the SQL of the view"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+        if not issubclass(model, AbstractSeriesView):
+            raise CommandError(f"{model._meta.label} is not a series view")
+        app_label = model._meta.app_label
+
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaves = loader.graph.leaf_nodes(app_label)
+        if len(leaves) != 1:
+            raise CommandError(f"{app_label} must have exactly one leaf migration (run makemigrations first)")
+        leaf = leaves[0]
+
+        # Restores the view of the latest operation on this model when the new migration is reversed
+        previous = None
+        for node in reversed(loader.graph.forwards_plan(leaf)):
+            for operation in reversed(loader.graph.nodes[node].operations):
+                if isinstance(operation, CreateSeriesView) and operation.model == model._meta.label:
+                    previous = operation
+                    break
+            if previous is not None:
+                break
+
+        sql, params = model.get_view_sql(connections[options["database"]])
+        operation = CreateSeriesView(
+            model._meta.label,
+            sql,
+            params,
+            previous_sql=previous.sql if previous else None,
+            previous_params=previous.params if previous else (),
+        )
+
+        match = re.match(r"^\d+", leaf[1])
+        number = int(match.group()) + 1 if match else 1
+        migration = migrations.Migration(
+            f"{number:04d}_{options['name'] or operation.migration_name_fragment}", app_label
+        )
+        migration.dependencies = [leaf]
+        migration.operations = [operation]
+
+        writer = MigrationWriter(migration)
+        os.makedirs(writer.basedir, exist_ok=True)
+        with open(writer.path, "w", encoding="utf-8") as file:
+            file.write(writer.as_string())
+        if options["verbosity"] >= 1:
+            self.stdout.write(f"Created {writer.path}")
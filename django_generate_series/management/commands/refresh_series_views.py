@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from django_generate_series.models import AbstractSeriesView
+
+
+class Command(BaseCommand):
+    help = "Refreshes the materialized views of series aggregations (subclasses of AbstractSeriesView)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            metavar="app_label.ModelName",
+            help="The views to refresh. Defaults to all of them",
+        )
+        parser.add_argument(
+            "--no-concurrently",
+            action="store_false",
+            dest="concurrently",
+            help="Refresh without CONCURRENTLY, which locks out reads but is faster, and works on unpopulated views",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="The database to refresh the views in")
+
+    def handle(self, *args, **options):
+        views = [model for model in apps.get_models() if issubclass(model, AbstractSeriesView)]
+        if options["models"]:
+            try:
+                selected = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as error:
+                raise CommandError(error)
+            for model in selected:
+                if model not in views:
+                    raise CommandError(f"{model._meta.label} is not a series view")
+            views = selected
+
+        for model in views:
+            model.refresh(concurrently=options["concurrently"], using=options["database"])
+            if options["verbosity"] >= 1:
+                self.stdout.write(f"Refreshed {model._meta.label}")
@@ -1,18 +1,55 @@
+import copy
+import dataclasses
 import decimal
+import functools
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date, datetime
+from datetime import time as datetime_time
+from datetime import timedelta
 from decimal import Decimal
-from typing import List, Optional, Type, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
 
 import django
-from django.contrib.postgres import fields as pg_models
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.core.exceptions import ImproperlyConfigured
-from django.db import models
-from django.db.models import Field
+from django.db import connections, models, router
+from django.db.models import (
+    Aggregate,
+    Avg,
+    Count,
+    Exists,
+    F,
+    Field,
+    FloatField,
+    Func,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    RowRange,
+    Sum,
+    Value,
+    Window,
+)
+from django.db.models.expressions import Expression, RawSQL
+from django.db.models.functions import Cast, Coalesce, Now, RowNumber
 from django.db.models.sql import Query
 from django.utils.timezone import datetime as datetimetz
+from django.utils.timezone import get_current_timezone_name, localdate
+from django.utils.timezone import now as timezone_now
 
-from django_generate_series.base import NoEffectManager, NoEffectQuerySet
+from django_generate_series.base import NoEffectManager, NoEffectQuerySet, ReadOnlyQuerySet, _warn_no_effect
+from django_generate_series.cache import (
+    CACHE_KEY_PREFIX,
+    _check_invalidation,
+    _get_model_versions,
+    _get_query_models,
+)
 from django_generate_series.exceptions import ModelFieldNotSupported
 
 INTERVAL_UNITS = (
@@ -44,11 +81,81 @@ INTERVAL_UNITS = (
 )
 
 
+# Set of INTERVAL_UNITS, for constant-time membership checks
+_INTERVAL_UNITS = frozenset(INTERVAL_UNITS)
+
+
 @dataclass
 class Params:
     start: Union[int, date, datetime, datetimetz]
     stop: Union[int, date, datetime, datetimetz]
-    step: Optional[Union[int, str]] = None
+    # Interval steps can be strings (e.g.: "1 days"), timedeltas, or dateutil relativedeltas
+    step: Optional[Union[int, Decimal, str, timedelta]] = None
+    # For range series only: the width of each range, independent of the step between range starts
+    width: Optional[Union[int, Decimal, str, timedelta]] = None
+
+
+def _range_fields(*names: str) -> Tuple[Type[Field], ...]:
+    """
+    Returns the named Postgres range field classes, without importing django.contrib.postgres
+
+    django.contrib.postgres requires psycopg and adds noticeable import time, so it is never imported here. A range
+        field class can only be in use if its module has already been imported, so when the module is absent there
+        is nothing to match against and an empty tuple is returned.
+    """
+    pg_models = sys.modules.get("django.contrib.postgres.fields")
+    if pg_models is None:
+        return ()
+    return tuple(getattr(pg_models, name) for name in names)
+
+
+def _relativedelta_types() -> tuple:
+    """Returns a tuple with dateutil's relativedelta class if it has been imported (so that it can be in use)"""
+    module = sys.modules.get("dateutil.relativedelta")
+    return () if module is None else (module.relativedelta,)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_interval(value: str) -> Tuple[float, str]:
+    """Parses an interval string (e.g.: "6 hours") into its numeric value and its unit"""
+    # Make sure interval strings are formatted correctly
+    #   Starting with a numeric value, then a space, and then a valid interval unit
+    try:
+        interval, interval_unit = value.split()
+    except ValueError:
+        raise Exception(
+            "Incorrect number of values for series step string. "
+            "Should be a numeric value, a space, and an interval type."
+        )
+
+    try:
+        interval = float(interval)
+    except ValueError:
+        raise ValueError("Invalid interval value. Must be capable of being converted to a numeric type.")
+
+    if interval_unit not in _INTERVAL_UNITS:
+        raise Exception("Invalid interval unit")
+
+    return interval, interval_unit
+
+
+def _get_interval_param(value):
+    """
+    Returns the query parameter for an interval step or width
+
+    Timedeltas are bound as they are (psycopg adapts them to intervals). Relativedeltas are bound as ISO 8601
+        durations, since psycopg cannot adapt them, and they may only hold relative values (e.g.: months=1).
+    """
+    if not isinstance(value, _relativedelta_types()):
+        return value
+
+    absolute = ("year", "month", "day", "weekday", "hour", "minute", "second", "microsecond")
+    if any(getattr(value, name) is not None for name in absolute):
+        raise ValueError("Relativedelta intervals can only have relative values (e.g.: months=1, not month=1)")
+
+    value = value.normalized()
+    seconds = Decimal(value.seconds) + Decimal(value.microseconds).scaleb(-6)
+    return f"P{value.years}Y{value.months}M{value.days}DT{value.hours}H{value.minutes}M{seconds}S"
 
 
 class AbstractBaseSeriesModel(models.Model):
@@ -56,22 +163,121 @@ class AbstractBaseSeriesModel(models.Model):
         abstract = True
 
 
+FILL_STRATEGIES = (None, "constant", "locf", "linear")
+
+# Granularities of rollups, from the finest to the coarsest (each is a date_trunc field)
+ROLLUP_LEVELS = ("minute", "hour", "day", "week", "month", "quarter", "year")
+
+# Alias of the series within the subqueries which assign rows of another model to range buckets
+BUCKET_SERIES_ALIAS = "_series_buckets"
+
+
+def _compile_with_extra_from(query: Query, connection, extra_from: str, extra_params: tuple):
+    """Compiles `query`, appending `extra_from` (e.g.: a CROSS JOIN) to the end of its FROM clause"""
+    compiler = query.get_compiler(connection=connection)
+    get_from_clause_method = compiler.get_from_clause
+
+    def get_from_clause_wrapper(*args, **kwargs):
+        result, params = get_from_clause_method(*args, **kwargs)
+        return result + [extra_from], tuple(params) + tuple(extra_params)
+
+    compiler.get_from_clause = get_from_clause_wrapper
+    return compiler.as_sql()
+
+
 class GenerateSeriesQuery(Query):
     def __init__(self, *args, _series_func=None, _series_func_params=None, **kwargs):
         self._series_func = _series_func
         self._series_func_params = _series_func_params
+        # Callables returning (sql, params) for joins to add after the series in the FROM clause
+        self._series_joins = []
+        # Whether the joins compute values from other buckets of the series (e.g.: fills)
+        self._series_neighbour_dependent = False
+        # (name, materialized) when the series is generated once, in a WITH clause, instead of in the FROM clause
+        self._series_cte = None
+        # Models read by the joins, whose changes invalidate cached results
+        self._series_dependencies = ()
+        # (weekdays, holidays) left out of the series itself, see GenerateSeriesQuerySet.business_days
+        self._series_excluded_days = None
+        # (weekdays, times, timezone) of the slots which replace the series, see GenerateSeriesManager.generate_recurrence
+        self._series_recurrence = None
         return super().__init__(*args, **kwargs)
 
+    def clone(self):
+        obj = super().clone()
+        obj._series_joins = self._series_joins.copy()
+        return obj
+
+    def get_series_source(self, connection):
+        """Returns the raw query of the series, leaving out the excluded days, if any"""
+        source = self._series_func(self.model)
+        if self._series_recurrence is not None:
+            source = _get_recurrence_source(source, *self._series_recurrence)
+        if self._series_excluded_days is None:
+            return source
+
+        weekdays, holidays = self._series_excluded_days
+        conditions, params = [], []
+        if weekdays:
+            conditions.append(f'extract(isodow FROM "_series_days"."id") NOT IN ({", ".join("%s" for _ in weekdays)})')
+            params += weekdays
+        if isinstance(holidays, models.QuerySet):
+            sql, holiday_params = holidays.query.get_compiler(connection=connection).as_sql()
+            # The single column of the holidays is renamed, whatever its name in the queryset
+            conditions.append(
+                f'NOT EXISTS (SELECT 1 FROM ({sql}) AS "_series_holidays" ("day") '
+                f'WHERE "_series_holidays"."day" = "_series_days"."id")'
+            )
+            params += holiday_params
+        elif holidays:
+            conditions.append('NOT ("_series_days"."id" = ANY(%s::date[]))')
+            params.append(list(holidays))
+
+        source = copy.copy(source)
+        if conditions:
+            source.raw_query = (
+                f'(SELECT "_series_days"."id" FROM {source.raw_query} AS "_series_days" '
+                f'WHERE {" AND ".join(conditions)})'
+            )
+            source.sql_params = tuple(source.sql_params) + tuple(params)
+        return source
+
     def get_compiler(self, *args, **kwargs):
         compiler = super().get_compiler(*args, **kwargs)
         get_from_clause_method = compiler.get_from_clause
 
+        if self._series_cte is not None:
+            as_sql_method = compiler.as_sql
+
+            def as_sql_wrapper(*args, **kwargs):
+                source = self.get_series_source(compiler.connection)
+                sql, params = as_sql_method(*args, **kwargs)
+                name, materialized = self._series_cte
+                materialized = {None: "", True: "MATERIALIZED ", False: "NOT MATERIALIZED "}[materialized]
+                sql = f"WITH {compiler.connection.ops.quote_name(name)} AS {materialized}{source.raw_query} {sql}"
+                return sql, tuple(source.sql_params) + tuple(params)
+
+            compiler.as_sql = as_sql_wrapper
+
         def get_from_clause_wrapper(*args, **kwargs):
-            source = self._series_func(self.model)
+            source = self.get_series_source(compiler.connection)
+            if self._series_cte is not None:
+                # The series itself, and any join using it, refer to the CTE by name
+                source = copy.copy(source)
+                source.raw_query = compiler.connection.ops.quote_name(self._series_cte[0])
+                source.sql_params = ()
             result, params = get_from_clause_method(*args, **kwargs)
             wrapper = source.raw_query
-            result[0] = f"{wrapper} AS {tuple(compiler.query.alias_map)[0]}"
-            params = (source.params.start, source.params.stop, source.params.step or 1) + tuple(params)
+            alias = tuple(compiler.query.alias_map)[0]
+            result[0] = f"{wrapper} AS {alias}"
+            series_params = source.sql_params
+
+            for join in self._series_joins:
+                join_sql, join_params = join(compiler, alias, source)
+                result[0] += f" {join_sql}"
+                series_params += tuple(join_params)
+
+            params = series_params + tuple(params)
 
             return result, params
 
@@ -89,8 +295,1007 @@ class GenerateSeriesQuerySet(NoEffectQuerySet):
                 _series_func=_series_func,
                 _series_func_params=_series_func_params,
             )
+        self._parallel_workers = None
+        self._cache_options = None
         return r
 
+    def _clone(self):
+        clone = super()._clone()
+        clone._parallel_workers = self._parallel_workers
+        clone._cache_options = self._cache_options
+        return clone
+
+    def cached(self, timeout: Optional[int] = DEFAULT_TIMEOUT, using: str = "default"):
+        """
+        Returns a QuerySet whose results are stored in Django's cache framework when it is evaluated
+
+        Entries are keyed by the compiled SQL and params, and by a version of each model which the query reads
+            (through annotate_buckets, annotate_top, and Subquery or Exists annotations). Saving or deleting an
+            instance of one of those models (post_save and post_delete) changes its version, so that entries
+            computed before are no longer used. Changes which do not send these signals (e.g.: QuerySet.update(),
+            bulk_create(), or raw SQL) are not detected.
+
+        The receivers are connected when the app is ready, for the models and caches configured in the settings
+            (see django_generate_series.cache), so that changes made by any process invalidate the entries.
+
+        timeout: the number of seconds entries are kept for. Defaults to the timeout of the cache
+        using: the alias of the cache, which must be one of the GENERATE_SERIES_CACHES setting. Its backend is
+            responsible for bounding the number of entries (e.g.: MAX_ENTRIES for the local-memory backend)
+        """
+        clone = self._chain()
+        clone._cache_options = (using, timeout)
+        return clone
+
+    def _fetch_cached(self) -> list:
+        using, timeout = self._cache_options
+        cache = caches[using]
+        dependencies = _get_query_models(self.query) - {self.model}
+        _check_invalidation(using, dependencies)
+
+        versions = _get_model_versions(cache, dependencies)
+        sql, params = self.query.get_compiler(using=self.db).as_sql()
+        key = repr((sql, params, self.db, self._iterable_class.__name__, versions))
+        key = f"{CACHE_KEY_PREFIX}:results:{hashlib.sha256(key.encode()).hexdigest()}"
+
+        results = cache.get(key)
+        if results is None:
+            uncached = self._chain()
+            uncached._cache_options = None
+            results = list(uncached)
+            cache.set(key, results, timeout)
+        return results
+
+    def as_cte(self, name: Optional[str] = None, materialized: Optional[bool] = None):
+        """
+        Returns a QuerySet which generates the series once, in a named WITH clause (a common table expression)
+
+        The FROM clause of the query, and joins which read the series again (range buckets of annotate_buckets,
+            and the "locf" and "linear" fills), then refer to the CTE instead of generating the series each time.
+            Other expressions of the same query can refer to it by name too, e.g. with RawSQL.
+
+        name: the name of the CTE. Defaults to the table name of the model, followed by "_series"
+        materialized: True for `AS MATERIALIZED`, False for `AS NOT MATERIALIZED`, or None to let Postgres decide
+        """
+        clone = self._chain()
+        clone.query._series_cte = (name or f"{self.model._meta.db_table}_series", materialized)
+        return clone
+
+    def business_days(
+        self, exclude_weekdays: Iterable[int] = (6, 7), holidays: Union[models.QuerySet, Iterable[date], None] = None
+    ):
+        """
+        Returns a QuerySet of the days of a date series which are not excluded weekdays or holidays
+
+        The days are left out of the series itself, in the database, so annotate_buckets, fills and other joins
+            only see the remaining days. Only available for date series models.
+
+        exclude_weekdays: ISO weekday numbers to leave out, from 1 (Monday) to 7 (Sunday). Defaults to weekends
+        holidays: dates to leave out, either as a list, or as a QuerySet selecting a single date column (e.g.:
+            Holiday.objects.values_list("day", flat=True)), which is anti-joined with NOT EXISTS
+        """
+        # DateTimeField is a subclass of DateField
+        if type(self.model._meta.get_field("id")) is not models.DateField:
+            raise ModelFieldNotSupported("Business days require a date series model")
+
+        exclude_weekdays = sorted(set(exclude_weekdays))
+        if any(not isinstance(weekday, int) or not 1 <= weekday <= 7 for weekday in exclude_weekdays):
+            raise ValueError("Weekdays must be ISO weekday numbers, from 1 (Monday) to 7 (Sunday)")
+
+        clone = self._chain()
+        if isinstance(holidays, models.QuerySet):
+            if len(holidays._fields or ()) != 1:
+                raise ValueError("A holidays QuerySet must select a single date column, e.g. with values_list()")
+            clone.query._series_dependencies += tuple(_get_query_models(holidays.query))
+        elif holidays is not None:
+            holidays = tuple(holidays)
+
+        clone.query._series_excluded_days = (exclude_weekdays, holidays)
+        return clone
+
+    def parallel(self, workers: int = 4):
+        """
+        Returns a QuerySet which is evaluated in parallel, as contiguous chunks of the series
+
+        The series params are split into (at most) `workers` sub-series, and the same query is run for each of them
+            in a thread pool, each thread using its own database connection. Iterating returns the rows of all
+            chunks in order, count() adds up the counts, and aggregate() combines the partial aggregates of the
+            chunks (Count, Sum, Min, Max and Avg, without distinct).
+
+        Since each chunk is evaluated separately, annotations which depend on other buckets (window functions,
+            cumulative and rolling aggregates, "locf" and "linear" fills) are not supported, and neither is ordering
+            by anything but the series id. Interval steps must have a fixed length (e.g.: days, but not months).
+            Each thread opens a new connection, so uncommitted changes of the current transaction are not visible.
+            Sliced querysets (e.g.: with get(), first() or indexing) are evaluated with a single query instead.
+        """
+        if workers < 1:
+            raise ValueError("The number of workers must be a positive value")
+
+        clone = self._chain()
+        clone._parallel_workers = workers
+        return clone
+
+    def _is_parallel(self) -> bool:
+        # Sliced querysets (including get(), first() and last()) are evaluated with a single query
+        return bool(self._parallel_workers) and not self.query.is_sliced
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._cache_options is not None:
+            self._result_cache = self._fetch_cached()
+        if self._result_cache is None and self._is_parallel():
+            self._result_cache = [row for rows in self._map_chunks(list) for row in rows]
+        super()._fetch_all()
+
+    def count(self):
+        if self._result_cache is None and self._is_parallel():
+            return sum(self._map_chunks(lambda chunk: chunk.count()))
+        return super().count()
+
+    def aggregate(self, *args, **kwargs):
+        if not self._is_parallel():
+            return super().aggregate(*args, **kwargs)
+
+        for arg in args:
+            kwargs[arg.default_alias] = arg
+
+        partials = _get_partial_aggregates(kwargs)
+        results = self._map_chunks(lambda chunk: chunk.aggregate(**partials))
+
+        def combine(name: str, function):
+            values = [result[name] for result in results if result[name] is not None]
+            return function(values) if values else None
+
+        combined = {}
+        for name, aggregate in kwargs.items():
+            if name in partials:
+                function = {Sum: sum, Min: min, Max: max}[_get_combining_aggregate(aggregate)]
+                combined[name] = combine(name, function)
+            else:
+                total, count = combine(f"_{name}_sum", sum), combine(f"_{name}_count", sum)
+                combined[name] = total / count if count else None
+        return combined
+
+    def _get_chunks(self) -> list:
+        """Returns a clone of this QuerySet for each contiguous chunk of the series, in the order of the results"""
+        query = self.query
+        if query._series_neighbour_dependent or any(
+            getattr(annotation, "contains_over_clause", False) for annotation in query.annotations.values()
+        ):
+            raise ValueError(
+                "Querysets with window functions or filled buckets depend on other buckets, "
+                "and cannot be evaluated in parallel"
+            )
+        ordering = tuple(query.order_by)
+        if ordering not in ((), ("id",), ("pk",), ("-id",), ("-pk",)):
+            raise ValueError("Querysets evaluated in parallel can only be ordered by the series id")
+
+        params = query._series_func_params
+        series_field = self.model._meta.get_field("id")
+        # Ranges of dates and datetimes without a width span consecutive values of the series, and recurrences
+        #   include every slot from start up to stop (excluded)
+        consecutive = query._series_recurrence is not None or (
+            params.width is None and isinstance(series_field, _range_fields("DateRangeField", "DateTimeRangeField"))
+        )
+        split_params = _split_params(params, self._parallel_workers, consecutive)
+        if query._series_recurrence is not None:
+            # The last chunk also covers the slots of the partial day before stop
+            split_params[-1] = dataclasses.replace(split_params[-1], stop=params.stop)
+
+        chunks = []
+        for chunk_params in split_params:
+            chunk = self._chain()
+            chunk._parallel_workers = None
+            chunk.query._series_func = lambda model, chunk_params=chunk_params: GenerateSeriesManager.FromRaw(
+                model, chunk_params
+            )
+            chunk.query._series_func_params = chunk_params
+            chunks.append(chunk)
+
+        return chunks[::-1] if ordering and ordering[0].startswith("-") else chunks
+
+    def _map_chunks(self, function) -> list:
+        """Calls `function` with each chunk of the series in a thread pool, returning the results in order"""
+        chunks = self._get_chunks()
+
+        def run(chunk):
+            try:
+                return function(chunk)
+            finally:
+                # Connections are per thread, so close the one opened by this worker thread
+                connections[chunk.db].close()
+
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            return list(executor.map(run, chunks))
+
+    def as_arrays(self, *fields, as_numpy: bool = False):
+        """
+        Returns each selected column as a single array, fetched from the database in a single row
+
+        The series query is wrapped so that every column is collapsed with `array_agg(... ORDER BY id)`,
+            which avoids the per-row protocol and driver overhead of very large series.
+
+        fields: names of the fields and annotations to return. Defaults to all of them
+        as_numpy: if True, each array is returned as a NumPy array instead of a list
+        """
+        queryset = self.values(*dict.fromkeys(("id",) + fields)) if fields else self.values()
+        if not queryset.query.is_sliced:
+            queryset = queryset.order_by()
+
+        query = queryset.query
+        names = fields or (*query.extra_select, *query.values_select, *query.annotation_select)
+
+        connection = connections[queryset.db]
+        quote_name = connection.ops.quote_name
+        sql, params = query.get_compiler(connection=connection).as_sql()
+        arrays = ", ".join(f"array_agg({quote_name(name)} ORDER BY {quote_name('id')})" for name in names)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {arrays} FROM ({sql}) AS {quote_name('series')}", params)
+            row = cursor.fetchone()
+
+        # array_agg returns NULL rather than an empty array when the series has no rows
+        values = [value or [] for value in row]
+        if as_numpy:
+            import numpy
+
+            values = [_to_numpy_array(numpy, value) for value in values]
+
+        return dict(zip(names, values))
+
+    def annotate_buckets(
+        self,
+        queryset: models.QuerySet,
+        field: Union[str, Expression],
+        cumulative: bool = False,
+        fill: Optional[str] = None,
+        fill_value=None,
+        **aggregates,
+    ):
+        """
+        Aggregates the rows of `queryset` per bucket of the series, and annotates the results onto the series
+
+        The rows are grouped by bucket in a single pass, and the grouped results are then left joined to the series,
+            so buckets without any rows are kept (with 0 as the value of Count aggregates, and None for the others).
+
+        queryset: a QuerySet of the model to be aggregated (e.g.: SimpleOrder.objects.all())
+        field: the field or expression of `queryset` used to assign rows to buckets. For scalar series, it must
+            equal the bucket value (truncate it first if needed, e.g. with TruncDay). For range series, rows are
+            assigned to every range which contains it.
+        cumulative: if True, each bucket is annotated with the running total of the aggregates up to and including
+            that bucket. The aggregates are computed per bucket first, and then combined with a window function
+            (e.g.: `SUM(...) OVER (ORDER BY id)` for Sum and Count), keeping the cost linear in the number of buckets.
+        fill: how to fill buckets without a value, computed in the database over the whole series:
+            "constant": use `fill_value`
+            "locf": carry the last value forward (buckets before the first value are left as None)
+            "linear": interpolate linearly between the surrounding values, returning floats (buckets before the
+                first value and after the last value are left as None)
+        fill_value: the value used by the "constant" fill strategy
+        aggregates: the aggregates to compute per bucket (e.g.: daily_cost=Sum("cost"))
+        """
+        if fill not in FILL_STRATEGIES:
+            raise ValueError(f"Fill strategy must be one of: {', '.join(str(item) for item in FILL_STRATEGIES)}")
+        if fill == "constant" and fill_value is None:
+            raise ValueError("A fill_value must be provided for the 'constant' fill strategy")
+
+        # Fail early for aggregates which cannot be combined across buckets
+        combining_aggregates = {
+            name: _get_combining_aggregate(aggregate) for name, aggregate in aggregates.items() if cumulative
+        }
+
+        series_field = self.model._meta.get_field("id")
+        field = F(field) if isinstance(field, str) else field
+
+        grouped = queryset.order_by()
+        if isinstance(series_field, _range_fields("RangeField")):
+            bucket = RawSQL(f'"{BUCKET_SERIES_ALIAS}"."id"', (), output_field=series_field)
+            grouped = _filter_contained(grouped.annotate(_series_value=field, _series_bucket=bucket)).values(
+                "_series_bucket"
+            )
+        else:
+            grouped = grouped.values(_series_bucket=field)
+        grouped = grouped.annotate(**aggregates)
+
+        clone = self._chain()
+        join_alias = f"{self.model._meta.db_table}_buckets_{len(clone.query._series_joins)}"
+
+        def bucket_join(compiler, alias, source):
+            if isinstance(series_field, _range_fields("RangeField")):
+                sql, params = _compile_with_extra_from(
+                    grouped.query,
+                    compiler.connection,
+                    f'CROSS JOIN {source.raw_query} AS "{BUCKET_SERIES_ALIAS}"',
+                    source.sql_params,
+                )
+            else:
+                sql, params = grouped.query.get_compiler(connection=compiler.connection).as_sql()
+
+            if fill in ("locf", "linear"):
+                position = "lower({})" if isinstance(series_field, _range_fields("RangeField")) else "{}"
+                if isinstance(
+                    series_field, (models.DateField, *_range_fields("DateRangeField", "DateTimeRangeField"))
+                ):
+                    position = f"extract(epoch FROM {position})"
+                sql, params = _get_fill_sql(fill, list(aggregates), source, sql, params, position)
+
+            join_sql = (
+                f'LEFT JOIN ({sql}) AS "{join_alias}" '
+                f'ON "{join_alias}"."_series_bucket" = {compiler.quote_name_unless_alias(alias)}."id"'
+            )
+            return join_sql, params
+
+        clone.query._series_joins.append(bucket_join)
+        clone.query._series_dependencies += tuple(_get_query_models(queryset.query))
+        if fill in ("locf", "linear"):
+            clone.query._series_neighbour_dependent = True
+
+        annotations = {
+            name: RawSQL(f'"{join_alias}"."{name}"', (), output_field=grouped.query.annotations[name].output_field)
+            for name in aggregates
+        }
+        for name, column in annotations.items():
+            if fill == "constant":
+                annotations[name] = Coalesce(column, Value(fill_value), output_field=column.output_field)
+            elif fill == "linear":
+                annotations[name] = RawSQL(column.sql, (), output_field=FloatField())
+            elif fill is None and isinstance(aggregates[name], Count):
+                # Buckets without any rows have no grouped row to join, but count 0 rows
+                annotations[name] = Coalesce(column, Value(0), output_field=column.output_field)
+        for name, combining_aggregate in combining_aggregates.items():
+            annotations[name] = Window(
+                expression=combining_aggregate(annotations[name]),
+                order_by=F("id").asc(),
+                frame=RowRange(start=None, end=0),
+            )
+            if combining_aggregate is Sum:
+                # The running total is 0, rather than None, until the first bucket with rows
+                annotations[name] = Coalesce(annotations[name], Value(0), output_field=annotations[name].output_field)
+
+        return clone.annotate(**annotations)
+
+    def annotate_histogram(
+        self, queryset: models.QuerySet, field: Union[str, Expression], fill_value=None, **aggregates
+    ):
+        """
+        Aggregates the rows of `queryset` per histogram bucket, using the values of the series as bucket edges
+
+        Each row of the series is annotated with the aggregates of the rows of `queryset` whose `field` is at least
+            its value, and less than the next value of the generated series. Rows are assigned to buckets with
+            Postgres' width_bucket, against an array of the values of the generated series, in a single pass. The
+            edges are compiled with the query, from the series itself, so filters on the series (before or after)
+            only leave buckets out, without changing their edges. The last value of the series is the upper edge of
+            the last bucket, so its aggregates are always empty, as are those of buckets without any rows. Only
+            available for integer and decimal series.
+
+        queryset: a QuerySet of the model to be aggregated (e.g.: SimpleOrder.objects.all())
+        field: the numeric field or expression of `queryset` to build the histogram of
+        fill_value: if provided, the value of the aggregates of empty buckets (e.g.: 0)
+        aggregates: the aggregates to compute per bucket (e.g.: order_count=Count("id"))
+        """
+        series_field = self.model._meta.get_field("id")
+        if not isinstance(series_field, (models.IntegerField, models.DecimalField)):
+            raise ModelFieldNotSupported("Histograms require an integer or decimal series model")
+
+        # width_bucket needs the operand to have the same type as the edges in Postgres < 14. Both are compared as
+        #   plain numeric, so that values are neither rounded nor overflow the precision of the series field
+        field = Func(
+            F(field) if isinstance(field, str) else field,
+            template="(%(expressions)s)::numeric",
+            output_field=models.DecimalField(),
+        )
+
+        clone = self._chain()
+        join_alias = f"{self.model._meta.db_table}_histogram_{len(clone.query._series_joins)}"
+        columns = "".join(f', "_series_grouped"."{name}"' for name in aggregates)
+
+        def histogram_join(compiler, alias, source):
+            # The edges are the values of the series itself (less any excluded days), whatever its filters and joins
+            edges_sql = (
+                f'SELECT array_agg("id"::numeric ORDER BY "id") AS "edges" FROM {source.raw_query} AS "_series_edges"'
+            )
+            edges_params = tuple(source.sql_params)
+            bucket = Func(
+                field,
+                RawSQL(f"({edges_sql})", edges_params),
+                function="width_bucket",
+                output_field=models.IntegerField(),
+            )
+            grouped = queryset.order_by().values(_series_bucket=bucket).annotate(**aggregates)
+            sql, params = grouped.query.get_compiler(connection=compiler.connection).as_sql()
+            # Bucket n covers [edges[n], edges[n + 1]), so it is joined to the series by its lower edge
+            sql = (
+                f'SELECT "_series_edges"."edges"["_series_grouped"."_series_bucket"] AS "_series_bucket"{columns} '
+                f'FROM ({sql}) AS "_series_grouped" CROSS JOIN ({edges_sql}) AS "_series_edges" '
+                f'WHERE "_series_grouped"."_series_bucket" BETWEEN 1 AND cardinality("_series_edges"."edges") - 1'
+            )
+            join_sql = (
+                f'LEFT JOIN ({sql}) AS "{join_alias}" '
+                f'ON "{join_alias}"."_series_bucket" = {compiler.quote_name_unless_alias(alias)}."id"'
+            )
+            return join_sql, tuple(params) + edges_params
+
+        clone.query._series_joins.append(histogram_join)
+        clone.query._series_dependencies += tuple(_get_query_models(queryset.query))
+        # The edges of each bucket are read from the whole series
+        clone.query._series_neighbour_dependent = True
+
+        resolved = queryset.order_by().annotate(**aggregates).query.annotations
+        annotations = {}
+        for name in aggregates:
+            output_field = resolved[name].output_field
+            annotations[name] = RawSQL(f'"{join_alias}"."{name}"', (), output_field=output_field)
+            if fill_value is not None:
+                annotations[name] = Coalesce(annotations[name], Value(fill_value), output_field=output_field)
+        return clone.annotate(**annotations)
+
+    def annotate_top(
+        self,
+        queryset: models.QuerySet,
+        field: Union[str, Expression],
+        limit: int,
+        rank: Optional[str] = None,
+        keep_empty: bool = False,
+        **fields,
+    ):
+        """
+        Joins the first `limit` rows of `queryset` in each bucket of the series, with a LATERAL subquery
+
+        The subquery is run once per bucket, so with an index on `field` and the ordering of `queryset`, each bucket
+            only reads its first rows. The results are flattened: the series returns a row per bucket and joined row.
+
+        queryset: an ordered QuerySet of the model to be joined (e.g.: Event.objects.order_by("-ticket_qty"))
+        field: the field or expression of `queryset` used to assign rows to buckets, as in annotate_buckets
+        limit: the maximum number of rows per bucket
+        rank: if provided, the name of an annotation with the position (starting at 1) of each row in its bucket
+        keep_empty: if True, buckets without any rows are kept once, with None for each field (LEFT JOIN LATERAL)
+        fields: the annotations to add, mapped to fields or expressions of `queryset` (e.g.: tickets="ticket_qty")
+        """
+        if limit < 1:
+            raise ValueError("The limit must be a positive value")
+        if not queryset.ordered:
+            raise ValueError("The queryset must be ordered, to select the first rows of each bucket")
+        if queryset.query.is_sliced:
+            raise ValueError("The queryset must not be sliced, use the limit instead")
+        if not fields:
+            raise ValueError("At least one field must be provided")
+
+        series_field = self.model._meta.get_field("id")
+        field = F(field) if isinstance(field, str) else field
+        ordering = []
+        for item in queryset.query.order_by:
+            if isinstance(item, str):
+                item = F(item[1:]).desc() if item.startswith("-") else F(item).asc()
+            ordering.append(item)
+        columns = {name: F(value) if isinstance(value, str) else value for name, value in fields.items()}
+        if rank is not None:
+            columns[rank] = Window(expression=RowNumber(), order_by=ordering)
+
+        def get_lateral(quoted_alias: str):
+            bucket = RawSQL(f'{quoted_alias}."id"', (), output_field=series_field)
+            lateral = queryset.annotate(_series_value=field, _series_bucket=bucket)
+            if isinstance(series_field, _range_fields("RangeField")):
+                lateral = _filter_contained(lateral)
+            else:
+                lateral = lateral.filter(_series_value=F("_series_bucket"))
+            return lateral.values(**columns)[:limit]
+
+        clone = self._chain()
+        join_alias = f"{self.model._meta.db_table}_top_{len(clone.query._series_joins)}"
+
+        def lateral_join(compiler, alias, source):
+            lateral = get_lateral(compiler.quote_name_unless_alias(alias))
+            sql, params = lateral.query.get_compiler(connection=compiler.connection).as_sql()
+            if keep_empty:
+                return f'LEFT JOIN LATERAL ({sql}) AS "{join_alias}" ON true', params
+            return f'CROSS JOIN LATERAL ({sql}) AS "{join_alias}"', params
+
+        clone.query._series_joins.append(lateral_join)
+        clone.query._series_dependencies += tuple(_get_query_models(queryset.query))
+
+        output_fields = get_lateral(self.model._meta.db_table).query.annotations
+        return clone.annotate(
+            **{
+                name: RawSQL(f'"{join_alias}"."{name}"', (), output_field=output_fields[name].output_field)
+                for name in columns
+            }
+        )
+
+    def annotate_rolling(self, preceding: int, **aggregates):
+        """
+        Annotates window aggregates computed over each bucket and the `preceding` buckets before it
+
+        The aggregates can refer to the series id and to any annotation of the series, including those added with
+            annotate_buckets. E.g.: annotate_rolling(6, weekly_cost=Sum("daily_cost")) for a 7-day rolling sum,
+            using `ROWS BETWEEN 6 PRECEDING AND CURRENT ROW`.
+        """
+        if preceding < 0:
+            raise ValueError("The number of preceding buckets must not be negative")
+
+        return self.annotate(
+            **{
+                name: Window(expression=aggregate, order_by=F("id").asc(), frame=RowRange(start=-preceding, end=0))
+                for name, aggregate in aggregates.items()
+            }
+        )
+
+    def rollup(
+        self,
+        queryset: models.QuerySet,
+        field: Union[str, Expression],
+        levels: Iterable[str] = ("day", "week", "month"),
+        **aggregates,
+    ) -> List[dict]:
+        """
+        Aggregates the rows of `queryset` at several granularities, returning the results of every level at once
+
+        The rows are aggregated per bucket of the series once (as with annotate_buckets), and the per-bucket results
+            are then combined with `GROUP BY GROUPING SETS` over `date_trunc` of each level, in a single query. Only
+            available for date and datetime series models, whose buckets should be finer than every level. Datetimes
+            are truncated in the current timezone, as with Trunc.
+
+        queryset: a QuerySet of the model to be aggregated (e.g.: SimpleOrder.objects.all())
+        field: the field or expression of `queryset` used to assign rows to the buckets of the series
+        levels: the date_trunc fields to roll up to (e.g.: "day", "week" and "month")
+        aggregates: the aggregates to compute per bucket of each level. Count, Sum, Min, Max and Avg are supported
+
+        Returns a list of dicts of the level, the truncated bucket ("id") and the aggregates, ordered by the given
+            levels and then by bucket.
+        """
+        series_field = self.model._meta.get_field("id")
+        if type(series_field) not in (models.DateField, models.DateTimeField):
+            raise ModelFieldNotSupported("Rollups require a date or datetime series model")
+
+        levels = list(dict.fromkeys(levels))
+        valid_levels = ROLLUP_LEVELS[2:] if type(series_field) is models.DateField else ROLLUP_LEVELS
+        if not levels or any(level not in valid_levels for level in levels):
+            raise ValueError(f"Rollup levels must be among: {', '.join(valid_levels)}")
+
+        partials = _get_partial_aggregates(aggregates)
+        buckets = self.annotate_buckets(queryset, field, **partials).order_by().values("id", *partials)
+
+        connection = connections[buckets.db]
+        quote_name = connection.ops.quote_name
+        sql, params = buckets.query.get_compiler(connection=connection).as_sql()
+
+        # Levels are validated above, so they can be part of the SQL, and the GROUP BY matches the SELECT list
+        truncated = [f'date_trunc(\'{level}\', "_series_rollup"."id")' for level in levels]
+        if type(series_field) is models.DateField:
+            truncated = [f"({item})::date" for item in truncated]
+        elif settings.USE_TZ:
+            # As with Trunc, datetimes are truncated in the current timezone rather than in the session one (UTC)
+            tzname = get_current_timezone_name().replace("'", "''")
+            truncated = [
+                f"date_trunc('{level}', \"_series_rollup\".\"id\" AT TIME ZONE '{tzname}') AT TIME ZONE '{tzname}'"
+                for level in levels
+            ]
+        level_sql = " ".join(f"WHEN GROUPING({item}) = 0 THEN {index}" for index, item in enumerate(truncated))
+        bucket_sql = " ".join(f"WHEN GROUPING({item}) = 0 THEN {item}" for item in truncated)
+
+        columns = [f"CASE {level_sql} END AS {quote_name('level')}", f"CASE {bucket_sql} END AS {quote_name('id')}"]
+        converters = {}
+        for name, aggregate in aggregates.items():
+            if name in partials:
+                output_field = buckets.query.annotations[name].output_field
+                combining_aggregate = _get_combining_aggregate(aggregate)
+                if combining_aggregate is Sum:
+                    # SUM(bigint) is numeric, and may not fit the type of the partial sums, so it is converted to the
+                    #   output field in Python
+                    columns.append(f"SUM({quote_name(name)}) AS {quote_name(name)}")
+                    converters[name] = output_field.to_python
+                else:
+                    columns.append(
+                        f"CAST({combining_aggregate.function}({quote_name(name)}) "
+                        f"AS {output_field.cast_db_type(connection)}) AS {quote_name(name)}"
+                    )
+            else:
+                columns.append(
+                    f'SUM({quote_name(f"_{name}_sum")})::double precision '
+                    f'/ NULLIF(SUM({quote_name(f"_{name}_count")}), 0) AS {quote_name(name)}'
+                )
+
+        sql = (
+            f'SELECT {", ".join(columns)} FROM ({sql}) AS "_series_rollup" '
+            f'GROUP BY GROUPING SETS ({", ".join(f"({item})" for item in truncated)}) ORDER BY 1, 2'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        names = ["level", "id", *aggregates]
+        results = []
+        for row in rows:
+            result = dict(zip(names, (levels[row[0]], *row[1:])))
+            for name, converter in converters.items():
+                if result[name] is not None:
+                    result[name] = converter(result[name])
+            results.append(result)
+        return results
+
+    def refresh_buckets(
+        self,
+        model: Type[models.Model],
+        bucket_field: str,
+        queryset: models.QuerySet,
+        field: Union[str, Expression],
+        updated_at: Optional[str] = None,
+        refreshed_at: str = "refreshed_at",
+        fill_value=None,
+        **aggregates,
+    ) -> int:
+        """
+        Incrementally stores the aggregates of each bucket of the series in the table of `model`
+
+        Each stored bucket records when it was last refreshed, and the latest of these times is the refresh watermark.
+            Only the buckets which had started by then (the latest of them may have been partial) and the later ones
+            are recomputed, along with older buckets of rows updated since the refresh watermark according to
+            `updated_at`, and then upserted with insert_into. The rows of `queryset` are filtered to those buckets
+            before being aggregated, so older buckets are served from the table without being read again. Series
+            may extend past the current time (e.g.: with fill_value), as future buckets are recomputed until they
+            have started. Only available for date and datetime series models.
+
+        model: the model storing the buckets, with a unique `bucket_field`, a nullable datetime field `refreshed_at`,
+            and a field for each aggregate
+        bucket_field: the name of the field of `model` holding the bucket value
+        queryset: a QuerySet of the model to be aggregated (e.g.: SimpleOrder.objects.all())
+        field: the field or expression of `queryset` equal to the bucket value (as with annotate_buckets)
+        updated_at: the name of a datetime field of `queryset` set when its rows change (e.g.: with auto_now).
+            Without it, changes to rows of buckets which had started before the last refresh are not picked up
+        refreshed_at: the name of the datetime field of `model` set to the time of the refresh of each bucket
+        fill_value: if provided, the value stored for the aggregates of buckets without any rows (e.g.: 0)
+        aggregates: the aggregates to store, named after fields of `model` (e.g.: total_cost=Sum("cost"))
+
+        Returns the number of inserted or updated rows.
+
+        Note: deleted rows are not tracked by `updated_at`, so buckets of deleted rows are only recomputed if they
+            are deleted from the table too, as buckets of the series missing from the table are always computed.
+        """
+        series_field = self.model._meta.get_field("id")
+        if type(series_field) not in (models.DateField, models.DateTimeField):
+            raise ModelFieldNotSupported("Incremental refreshes require a date or datetime series model")
+
+        # Taken before reading any row, with the clock which sets auto_now fields
+        now = timezone_now()
+        series = self
+        queryset = queryset.annotate(_series_value=F(field) if isinstance(field, str) else field)
+        stored = model._default_manager.using(self.db)
+        refreshed = stored.aggregate(refreshed=Max(refreshed_at))["refreshed"]
+        if refreshed is not None:
+            started = localdate(refreshed) if type(series_field) is models.DateField else refreshed
+            watermark = stored.filter(**{f"{bucket_field}__lte": started}).aggregate(watermark=Max(bucket_field))
+            watermark = watermark["watermark"]
+
+        # Every bucket is computed until one of them has been refreshed after it started
+        if refreshed is not None and watermark is not None:
+            # Older buckets missing from the table (deleted, or before the start of earlier series) are computed too
+            series = series.annotate(_series_stored=Exists(stored.filter(**{bucket_field: OuterRef("id")})))
+            queryset = queryset.annotate(
+                _series_stored=Exists(stored.filter(**{bucket_field: OuterRef("_series_value")}))
+            )
+            buckets = Q(_series_value__gte=watermark) | Q(_series_stored=False)
+            touched = Q(id__gte=watermark) | Q(_series_stored=False)
+            if updated_at is not None:
+                updated = queryset.filter(**{f"{updated_at}__gte": refreshed}).values("_series_value")
+                buckets |= Q(_series_value__in=updated)
+                touched |= Q(id__in=updated)
+            series = series.filter(touched)
+            queryset = queryset.filter(buckets)
+
+        fill = {"fill": "constant", "fill_value": fill_value} if fill_value is not None else {}
+        series = series.annotate_buckets(queryset, "_series_value", **fill, **aggregates)
+        field_map = {bucket_field: "id", refreshed_at: Value(now), **{name: name for name in aggregates}}
+        return series.insert_into(model, field_map, update_conflicts=True, unique_fields=[bucket_field])
+
+    def insert_into(
+        self,
+        model: Type[models.Model],
+        field_map: dict,
+        ignore_conflicts: bool = False,
+        update_conflicts: bool = False,
+        unique_fields: Optional[List[str]] = None,
+        update_fields: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Inserts a row into the table of `model` for each row of the series, with a single INSERT ... SELECT
+
+        No rows travel through Python, e.g. for populating calendar or booking slot tables, or for refreshing
+            rollup tables from an aggregation of the series (restricted to the buckets of the series).
+
+        model: the concrete model to insert into
+        field_map: names of fields of `model`, mapped to the value of each row: the name of a field or annotation
+            of the series (e.g.: {"start_datetime": "id"}), an expression (which can refer to those), or a constant.
+            Other concrete fields with a default (including primary keys other than AutoFields) are set to it,
+            evaluated once, so unique fields with a callable default must be provided. Fields with auto_now or
+            auto_now_add are set to the current time.
+        ignore_conflicts: if True, rows which conflict with existing rows are skipped (ON CONFLICT DO NOTHING)
+        update_conflicts: if True, rows which conflict on `unique_fields` update the existing rows instead
+            (ON CONFLICT (...) DO UPDATE), as with bulk_create. Existing rows which already have the same values
+            are left untouched.
+        unique_fields: the fields of the conflict target, required with update_conflicts
+        update_fields: the fields updated on conflicts. Defaults to the fields of `field_map` not in unique_fields
+
+        Returns the number of inserted or updated rows.
+        """
+        if ignore_conflicts and update_conflicts:
+            raise ValueError("ignore_conflicts and update_conflicts are mutually exclusive")
+        if not update_conflicts:
+            if unique_fields or update_fields:
+                raise ValueError("unique_fields and update_fields can only be used with update_conflicts")
+            return self._insert_select(model, field_map, " ON CONFLICT DO NOTHING" if ignore_conflicts else "")
+
+        if not unique_fields:
+            raise ValueError("unique_fields must be provided when update_conflicts is True")
+        if update_fields is None:
+            update_fields = [name for name in field_map if name not in unique_fields]
+        if not update_fields:
+            raise ValueError("update_fields must be provided when update_conflicts is True")
+
+        opts = model._meta
+        quote_name = connections[self._db or router.db_for_write(model)].ops.quote_name
+        target = ", ".join(quote_name(opts.get_field(name).column) for name in unique_fields)
+        columns = [quote_name(opts.get_field(name).column) for name in update_fields]
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns)
+        existing = ", ".join(f"{quote_name(opts.db_table)}.{column}" for column in columns)
+        excluded = ", ".join(f"EXCLUDED.{column}" for column in columns)
+        return self._insert_select(
+            model,
+            field_map,
+            f" ON CONFLICT ({target}) DO UPDATE SET {assignments} WHERE ({existing}) IS DISTINCT FROM ({excluded})",
+        )
+
+    def _insert_select(self, model: Type[models.Model], field_map: dict, suffix: str = "") -> int:
+        """Runs the INSERT ... SELECT of insert_into, appending `suffix` (e.g.: an ON CONFLICT clause)"""
+        opts = model._meta
+        values = {}
+        for name, value in field_map.items():
+            field = opts.get_field(name)
+            if isinstance(value, str):
+                value = F(value)
+            elif not hasattr(value, "resolve_expression"):
+                value = Value(value, output_field=field)
+            values[field.column] = value
+        for field in opts.concrete_fields:
+            # Auto-incremented primary keys are set by the database, but others (e.g. UUIDs) need their default
+            if field.column in values or isinstance(field, models.AutoField):
+                continue
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                # As set by pre_save when saving, but by the database for each row
+                values[field.column] = Now() if isinstance(field, models.DateTimeField) else Cast(Now(), field)
+            elif field.has_default():
+                if (field.unique or field.primary_key) and callable(field.default):
+                    # The default is evaluated once, so every row would get the same value
+                    raise ValueError(
+                        f"{opts.label}.{field.name} is unique, so its callable default cannot be used for every row. "
+                        "Provide a value for it."
+                    )
+                values[field.column] = Value(field.get_default(), output_field=field)
+
+        using = self._db or router.db_for_write(model)
+        connection = connections[using]
+        quote_name = connection.ops.quote_name
+        queryset = self.order_by().values(**{f"_insert_{index}": value for index, value in enumerate(values.values())})
+        sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+
+        columns = ", ".join(quote_name(column) for column in values)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {quote_name(opts.db_table)} ({columns}) {sql}{suffix}", params)
+            return cursor.rowcount
+
+
+def _filter_contained(queryset: models.QuerySet) -> models.QuerySet:
+    """
+    Filters `queryset`, annotated with `_series_value` and a range `_series_bucket`, to the values in each bucket
+
+    The values are compared with the bounds of the range, so that an index on them serves a range scan (which
+        `<@` alone cannot do before Postgres 17), and then checked with `<@`, for the inclusivity of the bounds.
+    """
+    output_field = queryset.query.annotations["_series_value"].output_field
+    lower = Func(F("_series_bucket"), function="lower", output_field=output_field)
+    upper = Func(F("_series_bucket"), function="upper", output_field=output_field)
+    return queryset.filter(
+        _series_value__gte=lower, _series_value__lte=upper, _series_value__contained_by=F("_series_bucket")
+    )
+
+
+def _get_fill_sql(fill: str, names: List[str], source, grouped_sql: str, grouped_params: tuple, position: str):
+    """
+    Wraps the per-bucket aggregates in a query over the whole series, filling the buckets without a value
+
+    Running counts of non-null values split the series into partitions which each start with a value, followed by
+        the buckets without one. The first value of each partition is carried forward ("locf"). For "linear", the
+        same counts taken in descending order give the next value, and buckets are interpolated between both
+        according to their position (the bucket value, or its epoch for dates and datetimes).
+    """
+    columns = ['"_series_fill"."id" AS "_series_bucket"']
+    for name in names:
+        value = f'"_series_grouped"."{name}"'
+        if fill == "linear":
+            columns += [
+                f'{value}::double precision AS "{name}"',
+                f'count({value}) OVER (ORDER BY "_series_fill"."id" DESC) AS "_next_{name}"',
+            ]
+        else:
+            columns.append(f'{value} AS "{name}"')
+        columns.append(f'count({value}) OVER (ORDER BY "_series_fill"."id") AS "_prev_{name}"')
+    if fill == "linear":
+        series_position = position.format('"_series_fill"."id"')
+        columns.append(f'({series_position})::double precision AS "_series_position"')
+
+    sql = (
+        f'SELECT {", ".join(columns)} FROM {source.raw_query} AS "_series_fill" '
+        f'LEFT JOIN ({grouped_sql}) AS "_series_grouped" '
+        f'ON "_series_grouped"."_series_bucket" = "_series_fill"."id"'
+    )
+    params = source.sql_params + tuple(grouped_params)
+
+    def first_value(column: str, name: str, direction: str) -> str:
+        order = '"_series_bucket" DESC' if direction == "next" else '"_series_bucket"'
+        return f'first_value("{column}") OVER (PARTITION BY "_{direction}_{name}" ORDER BY {order})'
+
+    if fill == "locf":
+        columns = ['"_series_bucket"'] + [f'{first_value(name, name, "prev")} AS "{name}"' for name in names]
+        return f'SELECT {", ".join(columns)} FROM ({sql}) AS "_series_fill"', params
+
+    columns = ['"_series_bucket"', '"_series_position"']
+    for name in names:
+        columns.append(f'"{name}"')
+        for direction in ("prev", "next"):
+            columns += [
+                f'{first_value(name, name, direction)} AS "_{direction}_value_{name}"',
+                f'{first_value("_series_position", name, direction)} AS "_{direction}_position_{name}"',
+            ]
+    sql = f'SELECT {", ".join(columns)} FROM ({sql}) AS "_series_fill"'
+
+    columns = ['"_series_bucket"']
+    for name in names:
+        columns.append(
+            f'COALESCE("{name}", "_prev_value_{name}" + ("_next_value_{name}" - "_prev_value_{name}") '
+            f'* ("_series_position" - "_prev_position_{name}") '
+            f'/ NULLIF("_next_position_{name}" - "_prev_position_{name}", 0)) AS "{name}"'
+        )
+    return f'SELECT {", ".join(columns)} FROM ({sql}) AS "_series_fill"', params
+
+
+def _get_partial_aggregates(aggregates: Dict[str, Aggregate]) -> Dict[str, Aggregate]:
+    """
+    Returns the aggregates to compute over parts of the rows, so that they can be combined afterwards
+
+    Avg is split into a sum and a count (as `_<name>_sum` and `_<name>_count`), and the other aggregates are kept
+        under their name, after checking that they have a combining aggregate.
+    """
+    partials = {}
+    for name, aggregate in aggregates.items():
+        if isinstance(aggregate, Avg) and not aggregate.distinct:
+            partials[f"_{name}_sum"] = Sum(*aggregate.source_expressions, filter=aggregate.filter)
+            partials[f"_{name}_count"] = Count(*aggregate.source_expressions, filter=aggregate.filter)
+        else:
+            _get_combining_aggregate(aggregate)
+            partials[name] = aggregate
+    return partials
+
+
+def _get_combining_aggregate(aggregate: Aggregate) -> Type[Aggregate]:
+    """Returns the aggregate used to combine partial results of `aggregate`, e.g. Sum for the results of Count"""
+    # Distinct results of separate buckets may overlap, so they cannot be combined
+    if not getattr(aggregate, "distinct", False):
+        for aggregate_class, combining_aggregate in ((Count, Sum), (Sum, Sum), (Min, Min), (Max, Max)):
+            if isinstance(aggregate, aggregate_class):
+                return combining_aggregate
+
+    raise ValueError(
+        f"Partial results of {aggregate!r} cannot be combined. "
+        "Only Count, Sum, Min and Max (without distinct) are supported."
+    )
+
+
+FIXED_INTERVAL_UNITS = {
+    "microsecond": timedelta(microseconds=1),
+    "millisecond": timedelta(milliseconds=1),
+    "second": timedelta(seconds=1),
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+def _interval_to_timedelta(value) -> timedelta:
+    """Converts an interval with a fixed length (e.g.: "6 hours", or a relativedelta of 6 hours) to a timedelta"""
+    if isinstance(value, timedelta):
+        return value
+    if isinstance(value, _relativedelta_types()):
+        _get_interval_param(value)
+        value = value.normalized()
+        if value.years or value.months:
+            raise ValueError("Intervals in months or years do not have a fixed length")
+        return timedelta(
+            days=value.days,
+            hours=value.hours,
+            minutes=value.minutes,
+            seconds=value.seconds,
+            microseconds=value.microseconds,
+        )
+
+    interval, interval_unit = _parse_interval(value)
+    unit = FIXED_INTERVAL_UNITS.get(interval_unit[:-1] if interval_unit.endswith("s") else interval_unit)
+    if unit is None:
+        raise ValueError(f"Intervals in {interval_unit} do not have a fixed length")
+    return interval * unit
+
+
+def _get_recurrence_source(source, weekdays: Optional[List[int]], times: List[datetime_time], timezone: str):
+    """
+    Returns a copy of `source` which generates the slots of a recurrence, from its start up to its stop (excluded)
+
+    A series of local days is crossed with the times of each day, and the weekdays are filtered, before each slot
+        is converted from its local time in `timezone`, so the slots follow daylight saving time.
+    """
+    start, stop = source.params.start, source.params.stop
+    weekday_filter = 'WHERE extract(isodow FROM "_series_day") = ANY(%s::integer[])' if weekdays else ""
+    sql = f"""
+        SELECT "_series_slot"."id" FROM (
+            SELECT ("_series_day"::date + "_series_time") AT TIME ZONE %s AS "id"
+            FROM generate_series(
+                (%s::timestamptz AT TIME ZONE %s)::date, (%s::timestamptz AT TIME ZONE %s)::date, interval '1 days'
+            ) AS "_series_day"
+            CROSS JOIN unnest(%s::time[]) AS "_series_time"
+            {weekday_filter}
+        ) AS "_series_slot"
+        WHERE "_series_slot"."id" >= %s AND "_series_slot"."id" < %s
+    """
+    params = (timezone, start, timezone, stop, timezone, times) + ((weekdays,) if weekdays else ()) + (start, stop)
+
+    source = copy.copy(source)
+    source.raw_query = f"({sql})"
+    source.sql_params = params
+    return source
+
+
+def _split_params(params: Params, chunks: int, consecutive: bool = False) -> List[Params]:
+    """
+    Splits params into at most `chunks` params for contiguous sub-series, which together produce the same series
+
+    The values of the series are divided as evenly as possible, aligned to the step. When `consecutive` is True,
+        each item of the series spans two consecutive values (ranges of dates and datetimes without a width),
+        so the chunks share their boundary values instead.
+    """
+    step = params.step or 1
+    if isinstance(step, (str, timedelta, *_relativedelta_types())):
+        step = _interval_to_timedelta(step)
+        if not isinstance(params.start, datetime) and step % timedelta(days=1):
+            raise ValueError("Date series can only be split with steps of whole days")
+    if not step > step * 0:
+        raise ValueError("Only series with a positive step can be split")
+
+    values = int((params.stop - params.start) // step) + 1
+    items = values - 1 if consecutive else values
+    # Every chunk needs a stop value larger than its start value
+    chunks = max(min(chunks, items if consecutive else items // 2), 1)
+    if chunks == 1:
+        return [params]
+
+    bounds = [index * items // chunks for index in range(chunks + 1)]
+    last_offset = 0 if consecutive else 1
+    return [
+        Params(
+            params.start + first * step,
+            params.start + (last - last_offset) * step,
+            params.step,
+            width=params.width,
+        )
+        for first, last in zip(bounds, bounds[1:])
+    ]
+
+
+def _to_numpy_array(numpy, values: list):
+    """Converts a decoded array to a NumPy array, using datetime64 for dates and datetimes"""
+    if values and isinstance(values[0], datetime):
+        # Aware datetimes are converted to naive UTC values, since datetime64 has no timezone support
+        return numpy.array(
+            [value.replace(tzinfo=None) - (value.utcoffset() or timedelta(0)) for value in values],
+            dtype="datetime64[us]",
+        )
+    if values and isinstance(values[0], date):
+        return numpy.array(values, dtype="datetime64[D]")
+    return numpy.asarray(values)
+
 
 class GenerateSeriesManager(NoEffectManager):
     """Custom manager for creating series"""
@@ -104,7 +1309,7 @@ class GenerateSeriesManager(NoEffectManager):
 
             # Verify the input params match for the type of model field used
 
-            if issubclass(self.id, (models.DecimalField, pg_models.DecimalRangeField)):
+            if issubclass(self.id, (models.DecimalField, *_range_fields("DecimalRangeField"))):
                 self.check_params(
                     start_type=[int, Decimal],
                     stop_type=[int, Decimal],
@@ -112,7 +1317,7 @@ class GenerateSeriesManager(NoEffectManager):
                 )
                 self.field_type = decimal.Decimal
 
-            elif issubclass(self.id, (models.DateField, pg_models.DateRangeField)):
+            elif issubclass(self.id, (models.DateField, *_range_fields("DateRangeField"))):
                 self.check_params(
                     start_type=[date],
                     stop_type=[date],
@@ -120,7 +1325,7 @@ class GenerateSeriesManager(NoEffectManager):
                 )
                 self.field_type = datetime.date
 
-            elif issubclass(self.id, (models.DateTimeField, pg_models.DateTimeRangeField)):
+            elif issubclass(self.id, (models.DateTimeField, *_range_fields("DateTimeRangeField"))):
                 self.check_params(
                     start_type=[datetime, datetimetz],
                     stop_type=[datetime, datetimetz],
@@ -133,8 +1338,7 @@ class GenerateSeriesManager(NoEffectManager):
                 (
                     models.BigIntegerField,
                     models.IntegerField,
-                    pg_models.BigIntegerRangeField,
-                    pg_models.IntegerRangeField,
+                    *_range_fields("BigIntegerRangeField", "IntegerRangeField"),
                 ),
             ):
                 self.check_params(
@@ -143,32 +1347,57 @@ class GenerateSeriesManager(NoEffectManager):
                     step_type=[int],
                 )
 
-                if issubclass(self.id, (models.BigIntegerField, pg_models.BigIntegerRangeField)):
+                if issubclass(self.id, (models.BigIntegerField, *_range_fields("BigIntegerRangeField"))):
                     self.field_type = "BigInteger"  # ToDo: Find a better way to standarize self.field_type
 
             else:
                 raise ModelFieldNotSupported("Invalid model field type used to generate series")
 
-            if issubclass(
-                self.id,
-                (
-                    pg_models.BigIntegerRangeField,
-                    pg_models.IntegerRangeField,
-                    pg_models.DecimalRangeField,
-                    pg_models.DateRangeField,
-                    pg_models.DateTimeRangeField,
-                ),
-            ):
+            if issubclass(self.id, _range_fields("RangeField")):
                 self.range = True
 
+            if self.params.width is not None and not self.range:
+                raise ValueError("A width can only be provided for range series")
+
             self.raw_query = f"({self.get_raw_query()})"
+            self.sql_params = self.get_sql_params()
 
         def get_raw_query(self):
             # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
             # ToDo: Generate the various raw SQL strings here, based on self.id and self.params
             # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
 
-            if self.range:
+            if self.range and self.params.width is not None:
+                # Each range starts at a value of the series and spans `width`, so ranges may overlap
+                #   (e.g.: 7-day windows every 1 day) or leave gaps, and are produced in a single pass.
+
+                if self.field_type is datetimetz:
+                    sql = """
+                        SELECT tstzrange(a, a + interval %s, '[)') AS id
+                        FROM generate_series(timestamptz %s, timestamptz %s, interval %s) AS a
+                    """
+                elif self.field_type == datetime.date:
+                    sql = """
+                        SELECT daterange(a::date, (a + interval %s)::date, '[)') AS id
+                        FROM generate_series(date %s, date %s, interval %s) AS a
+                    """
+                elif self.field_type is decimal.Decimal:
+                    sql = """
+                        SELECT numrange(a, a + %s) AS id
+                        FROM generate_series(%s, %s, %s) a
+                    """
+                elif self.field_type == "BigInteger":
+                    sql = """
+                        SELECT int8range(a, a + %s) AS id
+                        FROM generate_series(%s, %s, %s) a
+                    """
+                else:
+                    sql = """
+                        SELECT int4range(a, a + %s) AS id
+                        FROM generate_series(%s, %s, %s) a
+                    """
+
+            elif self.range:
 
                 if self.field_type is datetimetz:
                     ### WORKING!!
@@ -212,6 +1441,14 @@ class GenerateSeriesManager(NoEffectManager):
 
             return sql
 
+        def get_sql_params(self) -> tuple:
+            """Returns the parameters for the raw query, in the order they appear in the SQL"""
+            params = (self.params.start, self.params.stop, _get_interval_param(self.params.step or 1))
+            if self.range and self.params.width is not None:
+                # The width is used in the SELECT list, ahead of the generate_series arguments
+                return (_get_interval_param(self.params.width),) + params
+            return params
+
         def check_params(
             self,
             start_type: List[Union[Type[int], Type[decimal.Decimal], Type[date], Type[datetime], Type[datetimetz]]],
@@ -237,24 +1474,23 @@ class GenerateSeriesManager(NoEffectManager):
             if self.params.step is None and not isinstance(self.params.start, int):
                 raise Exception(f"Step must be provided for non-integer series")
 
-            # If step is a str, make sure it is formatted correctly
-            #   Starting with a numeric value, then a space, and then a valid interval unit
             if isinstance(self.params.step, str):
-                try:
-                    interval, interval_unit = self.params.step.split()
-                except ValueError:
-                    raise Exception(
-                        "Incorrect number of values for series step string. "
-                        "Should be a numeric value, a space, and an interval type."
-                    )
+                self.check_interval(self.params.step)
+            elif isinstance(self.params.step, _relativedelta_types()):
+                _get_interval_param(self.params.step)
 
-                try:
-                    interval = float(interval)
-                except ValueError:
-                    raise ValueError("Invalid interval value. Must be capable of being converted to a numeric type.")
+            if self.params.width is not None:
+                if isinstance(self.params.width, str):
+                    self.check_interval(self.params.width)
+                elif isinstance(self.params.width, _relativedelta_types()):
+                    _get_interval_param(self.params.width)
+                elif not self.params.width > self.params.width * 0:
+                    raise ValueError("Width must be a positive value")
 
-                if not interval_unit in INTERVAL_UNITS:
-                    raise Exception("Invalid interval unit")
+        @staticmethod
+        def check_interval(value: str):
+            # Parsed interval strings are cached, since the same steps are used again and again
+            _parse_interval(value)
 
     # def generate_series(self, params: Params = None):
     def generate_series(self, params: Union[tuple, list, Params] = None):
@@ -270,6 +1506,159 @@ class GenerateSeriesManager(NoEffectManager):
 
         return GenerateSeriesQuerySet(self.model, using=self._db, _series_func=series_func, _series_func_params=params)
 
+    def generate_series_batch(
+        self, params: Union[List[Union[tuple, list, Params]], Dict[str, Union[tuple, list, Params]]]
+    ):
+        """
+        Returns several independent series of this model, generated with a single UNION ALL query
+
+        Each series is tagged with a discriminator column, and the rows are then split back into separate lists
+            of instances, ordered by id.
+
+        params: a list of params (returning a list of results in the same order), or a dict of params (returning
+            a dict of results with the same keys)
+        """
+        keys = list(params) if isinstance(params, dict) else None
+        params_list = list(params.values()) if isinstance(params, dict) else list(params)
+        results = [[] for _ in params_list]
+
+        if params_list:
+            querysets = [
+                self.generate_series(item).annotate(_series_key=Value(index, output_field=models.IntegerField()))
+                for index, item in enumerate(params_list)
+            ]
+            batch = querysets[0].union(*querysets[1:], all=True).order_by("_series_key", "id")
+            for instance in batch:
+                results[instance.__dict__.pop("_series_key")].append(instance)
+
+        return dict(zip(keys, results)) if keys is not None else results
+
+    def generate_recurrence(
+        self,
+        start: datetime,
+        stop: datetime,
+        weekdays: Optional[Iterable[int]] = None,
+        times: Iterable[datetime_time] = (datetime_time(0),),
+        timezone=None,
+    ):
+        """
+        Returns a series of the slots of a recurrence, e.g.: every Monday and Thursday at 09:00 and 14:00
+
+        The slots are generated in the database, crossing a series of days with the times of each day, so they can
+            be joined against other models, or inserted with insert_into, without expanding the rule in Python.
+            Only available for datetime series models.
+
+        start: the first datetime which a slot can have
+        stop: the datetime before which the slots stop (excluded)
+        weekdays: ISO weekday numbers of the slots, from 1 (Monday) to 7 (Sunday). Defaults to every day
+        times: the local times of the slots of each day. Defaults to midnight
+        timezone: the name (or tzinfo) of the timezone of the times, e.g. "Europe/Paris", so that the slots follow
+            daylight saving time. Defaults to the current timezone
+        """
+        if type(self.model._meta.get_field("id")) is not models.DateTimeField:
+            raise ModelFieldNotSupported("Recurrences require a datetime series model")
+
+        if weekdays is not None:
+            weekdays = sorted(set(weekdays))
+            if not weekdays or any(not isinstance(weekday, int) or not 1 <= weekday <= 7 for weekday in weekdays):
+                raise ValueError("Weekdays must be ISO weekday numbers, from 1 (Monday) to 7 (Sunday)")
+        times = sorted(set(times))
+        if not times or any(not isinstance(value, datetime_time) or value.tzinfo is not None for value in times):
+            raise ValueError("Times must be naive time objects, in the timezone of the recurrence")
+
+        if timezone is None:
+            timezone = get_current_timezone_name()
+        elif not isinstance(timezone, str):
+            # zoneinfo and pytz timezones
+            timezone = getattr(timezone, "key", None) or getattr(timezone, "zone", None) or str(timezone)
+
+        queryset = self.generate_series([start, stop, "1 days"])
+        queryset.query._series_recurrence = (weekdays, times, timezone)
+        return queryset
+
+    def create_fixtures(self, model: Type[models.Model], count: int, **values) -> int:
+        """
+        Fills the table of `model` with `count` rows, with a single INSERT ... SELECT over an integer series
+
+        The rows are generated by the database, so no values travel through Python. Only available for integer
+            series models.
+
+        values: names of fields of `model`, mapped to the value of each row: an expression, which can refer to the
+            row number (from 1 to `count`) as "id" (e.g.: F("id") * 10, or RandomDateTime(start, timedelta(days=10))
+            from django_generate_series.expressions), or a constant. Other concrete fields are set as with
+            insert_into.
+
+        Returns the number of inserted rows.
+        """
+        if not issubclass(type(self.model._meta.get_field("id")), (models.BigIntegerField, models.IntegerField)):
+            raise ModelFieldNotSupported("Fixtures require an integer series model")
+        if count < 0:
+            raise ValueError("The count must not be negative")
+        if count == 0:
+            return 0
+
+        # Strings are constants here, rather than references to fields of the series
+        values = {
+            name: Value(value, output_field=model._meta.get_field(name)) if isinstance(value, str) else value
+            for name, value in values.items()
+        }
+        # A series needs a stop value larger than its start, so start at 0 and leave it out
+        return self.generate_series([0, count]).filter(id__gte=1)._insert_select(model, values)
+
+    def pk_ranges(
+        self, queryset: Union[Type[models.Model], models.QuerySet], chunk_size: int, skip_empty=False
+    ) -> Iterator:
+        """
+        Returns an iterator of non-overlapping ranges of primary keys which cover `[min(pk), max(pk)]` of `queryset`
+            in chunks
+
+        Each range can then be used to process a batch with a single index range scan, by comparing the primary key
+            with its bounds, e.g.: `Model.objects.filter(pk__gte=pk_range.lower, pk__lt=pk_range.upper)`. Only
+            available for integer range series models. The arguments are validated when called, and the queries
+            are run when iterating.
+
+        queryset: the model or QuerySet to be split into chunks
+        chunk_size: the number of primary key values covered by each range
+        skip_empty: if True, ranges without any rows are skipped, using a semi-join (EXISTS) against `queryset`
+        """
+        if not issubclass(
+            type(self.model._meta.get_field("id")), _range_fields("BigIntegerRangeField", "IntegerRangeField")
+        ):
+            raise ModelFieldNotSupported("Primary key ranges require an integer range series model")
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be a positive value")
+
+        if not isinstance(queryset, models.QuerySet):
+            queryset = queryset._default_manager.all()
+        return self._iter_pk_ranges(queryset.order_by(), chunk_size, skip_empty)
+
+    def _iter_pk_ranges(self, queryset: models.QuerySet, chunk_size: int, skip_empty: bool) -> Iterator:
+        bounds = queryset.aggregate(min_pk=Min("pk"), max_pk=Max("pk"))
+        if bounds["min_pk"] is None:
+            return
+
+        # A series needs a stop value larger than its start, so extend a single primary key to its own chunk
+        params = Params(bounds["min_pk"], max(bounds["max_pk"], bounds["min_pk"] + 1), chunk_size, width=chunk_size)
+        series = self.generate_series(params)
+        if bounds["min_pk"] == bounds["max_pk"]:
+            series = series.filter(id__contains=bounds["min_pk"])
+        if skip_empty:
+            # Comparing with the range bounds works for int4range and int8range series, and any integer primary key
+            lower = Func(OuterRef("id"), function="lower", output_field=models.BigIntegerField())
+            upper = Func(OuterRef("id"), function="upper", output_field=models.BigIntegerField())
+            series = series.filter(Exists(queryset.filter(pk__gte=lower, pk__lt=upper)))
+
+        yield from series.order_by("id").values_list("id", flat=True).iterator()
+
+
+# Base classes created by get_series_model, keyed by the arguments used to create them
+_series_model_cache: Dict[tuple, Type[models.Model]] = {}
+
+
+def clear_series_model_cache():
+    """Clears the cache of series base classes, so that subsequent calls to get_series_model create new ones"""
+    _series_model_cache.clear()
+
 
 def get_series_model(
     model_field: Field = None,
@@ -278,6 +1667,11 @@ def get_series_model(
     default_bounds: Optional[Union[str, None]] = None,
 ) -> models.Model:
 
+    # Repeated calls with the same arguments return the same abstract base class
+    cache_key = (model_field, max_digits, decimal_places, default_bounds)
+    if cache_key in _series_model_cache:
+        return _series_model_cache[cache_key]
+
     if model_field is None:
         raise Exception("model_field must be provided")
     if not issubclass(
@@ -288,11 +1682,13 @@ def get_series_model(
             models.DecimalField,
             models.DateField,
             models.DateTimeField,
-            pg_models.BigIntegerRangeField,
-            pg_models.IntegerRangeField,
-            pg_models.DecimalRangeField,
-            pg_models.DateRangeField,
-            pg_models.DateTimeRangeField,
+            *_range_fields(
+                "BigIntegerRangeField",
+                "IntegerRangeField",
+                "DecimalRangeField",
+                "DateRangeField",
+                "DateTimeRangeField",
+            ),
         ),
     ):
         raise ModelFieldNotSupported("Invalid model field type used to generate series")
@@ -304,11 +1700,7 @@ def get_series_model(
     class SeriesModel(AbstractBaseSeriesModel):
         if issubclass(
             model_field,
-            (
-                pg_models.DecimalRangeField,
-                pg_models.DateRangeField,
-                pg_models.DateTimeRangeField,
-            ),
+            _range_fields("DecimalRangeField", "DateRangeField", "DateTimeRangeField"),
         ):
             # Versions of Django > 4.1 include support for defining default range bounds for
             #   Range fields other than those based on Integer, so use it if provided.
@@ -333,4 +1725,58 @@ def get_series_model(
             abstract = True
             managed = False
 
+    _series_model_cache[cache_key] = SeriesModel
     return SeriesModel
+
+
+class AbstractSeriesView(models.Model):
+    """
+    Read-only model of a Postgres materialized view over a series aggregation
+
+    Subclasses define the fields of the view, and `get_view_queryset`, which returns the series as `values()` named
+        after the columns of the fields. The primary key is used as the unique index which allows refreshing the view
+        concurrently, so it must be unique (e.g.: the series id). Create the view with the CreateSeriesView migration
+        operation, and refresh it with `refresh` or the `refresh_series_views` management command.
+
+    Subclasses which define a Meta class should inherit from AbstractSeriesView.Meta, so that Django does not
+        manage a table for them.
+    """
+
+    objects = ReadOnlyQuerySet.as_manager()
+
+    save = _warn_no_effect
+    delete = _warn_no_effect
+
+    class Meta:
+        abstract = True
+        managed = False
+
+    @classmethod
+    def get_view_queryset(cls) -> models.QuerySet:
+        raise NotImplementedError("Subclasses of AbstractSeriesView must define get_view_queryset()")
+
+    @classmethod
+    def get_view_sql(cls, connection) -> Tuple[str, tuple]:
+        """Returns the SQL and params of the query of the view, checking that it selects the columns of the model"""
+        query = cls.get_view_queryset().query
+        names = [*query.extra_select, *query.values_select, *query.annotation_select]
+        columns = [field.column for field in cls._meta.concrete_fields]
+        if sorted(names) != sorted(columns):
+            raise ImproperlyConfigured(
+                f"The view queryset of {cls._meta.label} must select the columns {', '.join(columns)} "
+                f"with values(), but selects {', '.join(names)}"
+            )
+        return query.get_compiler(connection=connection).as_sql()
+
+    @classmethod
+    def refresh(cls, concurrently: bool = True, using: Optional[str] = None):
+        """
+        Refreshes the materialized view
+
+        concurrently: if True, the view is refreshed without locking out reads (REFRESH MATERIALIZED VIEW
+            CONCURRENTLY), using its unique index. This is slower, and requires the view to be populated already
+        """
+        connection = connections[using or router.db_for_write(cls)]
+        concurrently = "CONCURRENTLY " if concurrently else ""
+        with connection.cursor() as cursor:
+            cursor.execute(f"REFRESH MATERIALIZED VIEW {concurrently}{connection.ops.quote_name(cls._meta.db_table)}")
@@ -0,0 +1,82 @@
+from typing import Optional, Sequence
+
+from django.db import router
+from django.db.migrations.operations.base import Operation
+
+
+class CreateSeriesView(Operation):
+    """
+    Creates (or re-creates) the materialized view of a subclass of AbstractSeriesView, with its unique index
+
+    The SQL of the view is stored in the operation, as compiled from get_view_queryset when the migration was written
+        (with the make_series_view_migration management command), so that each migration creates the same view
+        whatever the current definition of the model. When the definition changes, write another migration, which
+        re-creates the view, and restores the previous SQL when reversed.
+
+    model: the label of the model (e.g.: "core.DailyOrderView"), whose table and primary key are read from the
+        migration state
+    sql, params: the query of the view
+    previous_sql, previous_params: the query of the view before this operation, if it re-creates an existing view
+    """
+
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(
+        self,
+        model: str,
+        sql: str,
+        params: Sequence = (),
+        previous_sql: Optional[str] = None,
+        previous_params: Sequence = (),
+    ):
+        self.model = model
+        self.sql = sql
+        self.params = tuple(params)
+        self.previous_sql = previous_sql
+        self.previous_params = tuple(previous_params)
+
+    def deconstruct(self):
+        kwargs = {"model": self.model, "sql": self.sql}
+        if self.params:
+            kwargs["params"] = self.params
+        if self.previous_sql is not None:
+            kwargs["previous_sql"] = self.previous_sql
+            if self.previous_params:
+                kwargs["previous_params"] = self.previous_params
+        return self.__class__.__qualname__, [], kwargs
+
+    def state_forwards(self, app_label, state):
+        # The model itself is added to the state by CreateModel, as for any unmanaged model
+        pass
+
+    def _create_view(self, schema_editor, state, sql: Optional[str], params: tuple):
+        app_label, model_name = self.model.split(".")
+        if not router.allow_migrate(schema_editor.connection.alias, app_label, model_name=model_name.lower()):
+            return
+        model = state.apps.get_model(self.model)
+        table = schema_editor.quote_name(model._meta.db_table)
+
+        schema_editor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {table}")
+        if sql is None:
+            return
+        schema_editor.execute(f"CREATE MATERIALIZED VIEW {table} AS {sql}", params or None)
+        # REFRESH MATERIALIZED VIEW CONCURRENTLY requires a unique index on the view
+        index = schema_editor.quote_name(f"{model._meta.db_table}_unique")
+        schema_editor.execute(
+            f"CREATE UNIQUE INDEX {index} ON {table} ({schema_editor.quote_name(model._meta.pk.column)})"
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._create_view(schema_editor, to_state, self.sql, self.params)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # from_state is the state after this operation, where the model still exists
+        self._create_view(schema_editor, from_state, self.previous_sql, self.previous_params)
+
+    def describe(self):
+        return f"Create materialized view of {self.model}"
+
+    @property
+    def migration_name_fragment(self):
+        return f"create_series_view_{self.model.split('.')[-1].lower()}"
@@ -0,0 +1,107 @@
+"""
+Benchmarks for django-generate-series
+
+Run from the root directory of the repository with:
+
+    python -m tests.example.core.benchmarks
+"""
+import datetime
+import decimal
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+IMPORT_SCRIPT = """
+import sys
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+# Imported after setup (rather than through INSTALLED_APPS) so that `-X importtime` reports it
+import django_generate_series.models
+
+print(any(name.startswith(("django.contrib.postgres", "psycopg")) for name in sys.modules))
+"""
+
+
+def get_import_time(module: str = "django_generate_series.models") -> dict:
+    """
+    Imports the package in a fresh interpreter, as a cold worker would, using `python -X importtime`
+
+    Returns the cumulative import time of `module` in microseconds, and whether django.contrib.postgres
+        or psycopg were imported along the way.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        # Lines are formatted as "import time: <self> | <cumulative> | <module>"
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            cumulative_us = int(fields[1])
+
+    return {
+        "cumulative_us": cumulative_us,
+        "postgres_imported": result.stdout.strip() == "True",
+    }
+
+
+def benchmark_import_time(runs: int = 5):
+    timings = [get_import_time() for _ in range(runs)]
+    best = min(timing["cumulative_us"] for timing in timings)
+    print(f"django_generate_series.models import time (best of {runs}): {best} us")
+    print(f"django.contrib.postgres imported: {any(timing['postgres_imported'] for timing in timings)}")
+
+
+def get_sequence_timings(count: int = 100_000, runs: int = 3) -> dict:
+    """
+    Times the pure-Python loops of sequence_utils against the vectorized django_generate_series.local module
+
+    Returns the best time in seconds of each implementation, for `count` datetimes and `count` decimals.
+    """
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(USE_TZ=True)
+
+    from django.utils import timezone
+
+    from django_generate_series import local
+    from tests.example.core import sequence_utils
+
+    start = timezone.now()
+    step = datetime.timedelta(minutes=1)
+    decimal_step = decimal.Decimal("0.25")
+    implementations = {
+        "datetimes (sequence_utils)": lambda: list(sequence_utils.get_datetime_sequence(start, step, num_steps=count)),
+        "datetimes (local generator)": lambda: list(local.get_datetime_sequence(start, step, num_steps=count)),
+        "datetimes (local array)": lambda: local.datetime_array(start, step, num_steps=count),
+        "decimals (sequence_utils)": lambda: list(
+            sequence_utils.get_decimal_sequence(step=decimal_step, num_steps=count)
+        ),
+        "decimals (local generator)": lambda: list(local.get_decimal_sequence(step=decimal_step, num_steps=count)),
+        "decimals (local array)": lambda: local.decimal_array(step=decimal_step, num_steps=count),
+    }
+    return {name: min(timeit.repeat(function, number=1, repeat=runs)) for name, function in implementations.items()}
+
+
+def benchmark_sequences(count: int = 100_000):
+    for name, seconds in get_sequence_timings(count).items():
+        print(f"{name}, {count} values: {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_import_time()
+    benchmark_sequences()
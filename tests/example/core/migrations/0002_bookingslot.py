@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start_datetime", models.DateTimeField(unique=True)),
+                ("capacity", models.IntegerField(default=1)),
+            ],
+        ),
+    ]
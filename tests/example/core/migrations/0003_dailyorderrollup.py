@@ -0,0 +1,30 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_bookingslot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOrderRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("order_count", models.IntegerField()),
+                ("total_cost", models.IntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:57
+
+import datetime
+
+from django.db import migrations, models
+
+import django_generate_series.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_trackedorder"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOrderView",
+            fields=[
+                ("day", models.DateField(primary_key=True, serialize=False)),
+                ("order_count", models.IntegerField()),
+                ("total_cost", models.IntegerField()),
+            ],
+            options={
+                "abstract": False,
+                "managed": False,
+            },
+        ),
+        django_generate_series.operations.CreateSeriesView(
+            model="core.DailyOrderView",
+            sql='SELECT COALESCE(("core_datetest_buckets_0"."order_count"), %s) AS "order_count", COALESCE(("core_datetest_buckets_0"."total_cost"), %s) AS "total_cost", ("core_datetest"."id")::date AS "day" FROM (SELECT generate_series(%s, %s, %s) id) AS core_datetest LEFT JOIN (SELECT "core_simpleorder"."order_date" AS "_series_bucket", COUNT("core_simpleorder"."id") AS "order_count", SUM("core_simpleorder"."cost") AS "total_cost" FROM "core_simpleorder" GROUP BY "core_simpleorder"."order_date") AS "core_datetest_buckets_0" ON "core_datetest_buckets_0"."_series_bucket" = "core_datetest"."id"',
+            params=(0, 0, datetime.date(2022, 1, 1), datetime.date(2022, 1, 7), "1 days"),
+        ),
+    ]
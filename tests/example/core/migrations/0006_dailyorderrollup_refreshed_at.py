@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_dailyorderview"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyorderrollup",
+            name="refreshed_at",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 11:12
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_dailyorderrollup_refreshed_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Ticket",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ("code", models.UUIDField(default=uuid.uuid4, unique=True)),
+                ("issued_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -1,7 +1,12 @@
+import datetime
+import uuid
+
 from django.contrib.postgres.fields import DateRangeField, DateTimeRangeField, DecimalRangeField, IntegerRangeField
 from django.db import models
+from django.db.models import Count, Sum
+from django.db.models.functions import Cast
 
-from django_generate_series.models import get_series_model
+from django_generate_series.models import AbstractSeriesView, get_series_model
 
 
 class IntegerTest(get_series_model(models.IntegerField)):
@@ -77,3 +82,48 @@ class Event(models.Model):
     event_datetime = models.DateTimeField()
     ticket_qty = models.IntegerField()
     false_field = models.BooleanField(default=False)
+
+
+class BookingSlot(models.Model):
+    start_datetime = models.DateTimeField(unique=True)
+    capacity = models.IntegerField(default=1)
+
+
+class DailyOrderRollup(models.Model):
+    day = models.DateField(unique=True)
+    order_count = models.IntegerField()
+    total_cost = models.IntegerField()
+    refreshed_at = models.DateTimeField(null=True)
+
+
+class TrackedOrder(models.Model):
+    order_date = models.DateField()
+    cost = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class Ticket(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    code = models.UUIDField(default=uuid.uuid4, unique=True)
+    issued_at = models.DateTimeField(auto_now_add=True)
+
+
+class DailyOrderView(AbstractSeriesView):
+    day = models.DateField(primary_key=True)
+    order_count = models.IntegerField()
+    total_cost = models.IntegerField()
+
+    @classmethod
+    def get_view_queryset(cls):
+        return (
+            DateTest.objects.generate_series([datetime.date(2022, 1, 1), datetime.date(2022, 1, 7), "1 days"])
+            .annotate_buckets(
+                SimpleOrder.objects.all(),
+                "order_date",
+                fill="constant",
+                fill_value=0,
+                order_count=Count("id"),
+                total_cost=Sum("cost"),
+            )
+            .values("order_count", "total_cost", day=Cast("id", models.DateField()))
+        )
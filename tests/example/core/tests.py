@@ -1,17 +1,32 @@
 import datetime
 import decimal
 import logging
+import os
 import warnings
+from io import StringIO
 from time import time
 
+import dateutil.tz
 import pytest
 from django.contrib.postgres.fields import DateRangeField, DateTimeRangeField, DecimalRangeField, IntegerRangeField
-from django.db import models
-from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, models, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Avg, Count, Exists, ExpressionWrapper, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.test import override_settings
 from django.utils import timezone
 from psycopg2.extras import DateRange, DateTimeTZRange, NumericRange
 
+from django_generate_series.aggregates import Mode, PercentileCont, PercentileDisc
+from django_generate_series.cache import _get_version_key, connect_receivers
+from django_generate_series.exceptions import ModelFieldNotSupported
+from django_generate_series.expressions import RandomChoice, RandomDate, RandomDateTime, RandomInteger
+from django_generate_series.operations import CreateSeriesView
+from tests.example.core.benchmarks import get_import_time
 from tests.example.core.models import (
+    BookingSlot,
     ConcreteDateRangeTest,
     ConcreteDateTest,
     ConcreteDateTimeRangeTest,
@@ -20,14 +35,20 @@ from tests.example.core.models import (
     ConcreteDecimalTest,
     ConcreteIntegerRangeTest,
     ConcreteIntegerTest,
+    DailyOrderRollup,
+    DailyOrderView,
     DateRangeTest,
     DateTest,
     DateTimeRangeTest,
     DateTimeTest,
     DecimalRangeTest,
     DecimalTest,
+    Event,
     IntegerRangeTest,
     IntegerTest,
+    SimpleOrder,
+    Ticket,
+    TrackedOrder,
 )
 from tests.example.core.random_utils import (
     get_random_date,
@@ -824,3 +845,1185 @@ def test_datetime_range_model():
         .count()
         == 9
     )
+
+
+@pytest.mark.django_db
+def test_as_arrays():
+    """Make sure series can be fetched as a single row of arrays"""
+
+    integer_test = IntegerTest.objects.generate_series([0, 9])
+    assert integer_test.as_arrays() == {"id": list(range(0, 10))}
+
+    doubled = integer_test.annotate(doubled=F("id") * 2)
+    assert doubled.as_arrays("doubled") == {"doubled": list(range(0, 20, 2))}
+    assert doubled.as_arrays() == {"id": list(range(0, 10)), "doubled": list(range(0, 20, 2))}
+    assert integer_test.filter(id__gt=100).as_arrays() == {"id": []}
+
+    datetime_sequence = tuple(get_datetime_sequence())
+    datetime_test = DateTimeTest.objects.generate_series([datetime_sequence[0], datetime_sequence[-1], "1 days"])
+    assert tuple(datetime_test.as_arrays()["id"]) == datetime_sequence
+
+    numpy = pytest.importorskip("numpy")
+    arrays = integer_test.as_arrays(as_numpy=True)
+    assert isinstance(arrays["id"], numpy.ndarray)
+    assert arrays["id"].sum() == 45
+
+    arrays = datetime_test.as_arrays(as_numpy=True)
+    assert arrays["id"].dtype == numpy.dtype("datetime64[us]")
+    assert arrays["id"][-1] - arrays["id"][0] == numpy.timedelta64(9, "D")
+
+
+def test_models_import_is_lazy():
+    """Importing the models module must not pull in django.contrib.postgres or psycopg"""
+    import_time = get_import_time()
+    assert import_time["cumulative_us"] is not None
+    assert not import_time["postgres_imported"]
+
+
+def test_series_model_cache():
+    """Repeated calls to get_series_model should return the same base class until the cache is cleared"""
+    from django_generate_series.models import clear_series_model_cache, get_series_model
+
+    integer_model = get_series_model(models.IntegerField)
+    assert integer_model is get_series_model(models.IntegerField)
+    assert integer_model in IntegerTest.__bases__
+
+    decimal_model = get_series_model(models.DecimalField, max_digits=9, decimal_places=2)
+    assert decimal_model is get_series_model(models.DecimalField, 9, 2)
+    assert decimal_model in DecimalTest.__bases__
+    assert decimal_model is not get_series_model(models.DecimalField, max_digits=9, decimal_places=3)
+
+    assert get_series_model(DecimalRangeField) is not get_series_model(DecimalRangeField, default_bounds="[]")
+
+    clear_series_model_cache()
+    assert integer_model is not get_series_model(models.IntegerField)
+
+
+@pytest.mark.django_db
+def test_range_width():
+    """Make sure range series can use a width which is independent of the step"""
+    from django_generate_series.models import Params
+
+    integer_range_test = IntegerRangeTest.objects.generate_series(Params(0, 9, 1, width=3))
+    assert integer_range_test.count() == 10
+    assert integer_range_test.first().id == NumericRange(0, 3, "[)")
+    assert integer_range_test.last().id == NumericRange(9, 12, "[)")
+    assert integer_range_test.filter(id__contains=5).count() == 3
+
+    # Gaps between ranges are also possible, when the width is smaller than the step
+    decimal_range_test = DecimalRangeTest.objects.generate_series(
+        [decimal.Decimal("0.00"), decimal.Decimal("9.00"), decimal.Decimal("3.00"), decimal.Decimal("0.50")]
+    )
+    assert decimal_range_test.count() == 4
+    assert decimal_range_test.last().id == NumericRange(decimal.Decimal("9.00"), decimal.Decimal("9.50"), "[)")
+
+    today = timezone.now().date()
+    date_range_test = DateRangeTest.objects.generate_series(
+        [today, today + timezone.timedelta(days=9), "1 days", "7 days"]
+    )
+    assert date_range_test.count() == 10
+    assert date_range_test.first().id == DateRange(today, today + timezone.timedelta(days=7), "[)")
+
+    now = timezone.now()
+    datetime_range_test = DateTimeRangeTest.objects.generate_series(
+        Params(now, now + timezone.timedelta(days=30), "1 days", width="7 days")
+    )
+    assert datetime_range_test.count() == 31
+    assert datetime_range_test.last().id == DateTimeTZRange(
+        now + timezone.timedelta(days=30), now + timezone.timedelta(days=37), "[)"
+    )
+
+    with pytest.raises(ValueError) as error_msg:
+        IntegerTest.objects.generate_series(Params(0, 9, 1, width=3)).count()
+    assert "A width can only be provided for range series" in str(error_msg.value)
+
+    with pytest.raises(ValueError) as error_msg:
+        IntegerRangeTest.objects.generate_series(Params(0, 9, 1, width=0)).count()
+    assert "Width must be a positive value" in str(error_msg.value)
+
+
+@pytest.mark.django_db
+def test_annotate_buckets(django_assert_num_queries):
+    """Make sure rows of another model can be aggregated per bucket and joined to the series"""
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((0, 10), (0, 5), (2, 7), (5, 1)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    date_test = DateTest.objects.generate_series([start, start + timezone.timedelta(days=6), "1 days"])
+    annotated = date_test.annotate_buckets(
+        SimpleOrder.objects.all(), "order_date", daily_cost=Sum("cost"), order_count=Count("id")
+    ).order_by("id")
+
+    with django_assert_num_queries(1):
+        results = [(item.daily_cost, item.order_count) for item in annotated]
+    assert results == [(15, 2), (None, 0), (7, 1), (None, 0), (None, 0), (1, 1), (None, 0)]
+    assert annotated.count() == 7
+
+    filtered = date_test.annotate_buckets(
+        SimpleOrder.objects.filter(cost__lt=10), "order_date", daily_cost=Sum("cost")
+    )
+    assert [item.daily_cost for item in filtered.order_by("id")][:3] == [5, None, 7]
+
+    # Range series aggregate every row contained by each range, including overlapping ranges
+    now = timezone.now()
+    for hours, ticket_qty in ((1, 1), (25, 2), (49, 3)):
+        Event.objects.create(event_datetime=now + timezone.timedelta(hours=hours), ticket_qty=ticket_qty)
+
+    datetime_range_test = DateTimeRangeTest.objects.generate_series(
+        [now, now + timezone.timedelta(days=3), "1 days", "2 days"]
+    ).annotate_buckets(Event.objects.all(), "event_datetime", tickets=Sum("ticket_qty"))
+    assert [item.tickets for item in datetime_range_test.order_by("id")] == [3, 5, 3, None]
+
+
+@pytest.mark.django_db
+def test_annotate_rolling(django_assert_num_queries):
+    """Make sure rolling window aggregates can be computed over the series and its annotations"""
+    integer_test = IntegerTest.objects.generate_series([1, 5]).annotate_rolling(1, pair_sum=Sum("id"))
+    assert [item.pair_sum for item in integer_test.order_by("id")] == [1, 3, 5, 7, 9]
+
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((0, 10), (1, 20), (3, 30)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    date_test = (
+        DateTest.objects.generate_series([start, start + timezone.timedelta(days=4), "1 days"])
+        .annotate_buckets(SimpleOrder.objects.all(), "order_date", daily_cost=Sum("cost"))
+        .annotate_rolling(2, rolling_cost=Sum("daily_cost"), rolling_days=Count("daily_cost"))
+        .order_by("id")
+    )
+    with django_assert_num_queries(1):
+        results = [(item.rolling_cost, item.rolling_days) for item in date_test]
+    assert results == [(10, 1), (30, 2), (30, 2), (50, 2), (30, 1)]
+
+    with pytest.raises(ValueError) as error_msg:
+        IntegerTest.objects.generate_series([1, 5]).annotate_rolling(-1, pair_sum=Sum("id"))
+    assert "The number of preceding buckets must not be negative" in str(error_msg.value)
+
+
+@pytest.mark.django_db
+def test_annotate_buckets_cumulative(django_assert_num_queries):
+    """Make sure running totals can be computed from the per-bucket aggregates"""
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((1, 10), (1, 5), (2, 7), (4, 1)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    date_test = (
+        DateTest.objects.generate_series([start, start + timezone.timedelta(days=5), "1 days"])
+        .annotate_buckets(
+            SimpleOrder.objects.all(),
+            "order_date",
+            cumulative=True,
+            total_cost=Sum("cost"),
+            total_orders=Count("id"),
+            largest_cost=Max("cost"),
+        )
+        .order_by("id")
+    )
+    with django_assert_num_queries(1):
+        results = [(item.total_cost, item.total_orders, item.largest_cost) for item in date_test]
+    assert results == [(0, 0, None), (15, 2, 10), (22, 3, 10), (22, 3, 10), (23, 4, 10), (23, 4, 10)]
+
+    with pytest.raises(ValueError) as error_msg:
+        DateTest.objects.generate_series([start, start + timezone.timedelta(days=5), "1 days"]).annotate_buckets(
+            SimpleOrder.objects.all(), "order_date", cumulative=True, average_cost=Avg("cost")
+        )
+    assert "cannot be combined" in str(error_msg.value)
+
+
+@pytest.mark.django_db
+def test_annotate_buckets_fill(django_assert_num_queries):
+    """Make sure buckets without a value can be filled in the database"""
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((1, 10), (4, 40), (4, 2)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    date_test = DateTest.objects.generate_series([start, start + timezone.timedelta(days=6), "1 days"])
+    orders = SimpleOrder.objects.all()
+
+    constant = date_test.annotate_buckets(orders, "order_date", fill="constant", fill_value=0, order_count=Count("id"))
+    assert [item.order_count for item in constant.order_by("id")] == [0, 1, 0, 0, 2, 0, 0]
+
+    locf = date_test.annotate_buckets(orders, "order_date", fill="locf", largest=Max("cost"), total=Sum("cost"))
+    with django_assert_num_queries(1):
+        results = [(item.largest, item.total) for item in locf.order_by("id")]
+    assert results == [(None, None), (10, 10), (10, 10), (10, 10), (40, 42), (40, 42), (40, 42)]
+
+    linear = date_test.annotate_buckets(orders, "order_date", fill="linear", largest=Max("cost"))
+    assert [item.largest for item in linear.order_by("id")] == [None, 10.0, 20.0, 30.0, 40.0, None, None]
+
+    for value in (2, 8):
+        ConcreteIntegerTest.objects.create(some_field=value)
+    integer_test = IntegerTest.objects.generate_series([0, 10]).annotate_buckets(
+        ConcreteIntegerTest.objects.all(), "some_field", fill="linear", value=Max("some_field")
+    )
+    assert [item.value for item in integer_test.order_by("id")][2:9] == [2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]
+
+    # Filling happens before running totals are computed
+    cumulative = date_test.annotate_buckets(
+        orders, "order_date", cumulative=True, fill="constant", fill_value=0, order_count=Count("id")
+    )
+    assert [item.order_count for item in cumulative.order_by("id")] == [0, 1, 1, 1, 3, 3, 3]
+
+    with pytest.raises(ValueError) as error_msg:
+        date_test.annotate_buckets(orders, "order_date", fill="nearest", total=Sum("cost"))
+    assert "Fill strategy must be one of" in str(error_msg.value)
+
+    with pytest.raises(ValueError) as error_msg:
+        date_test.annotate_buckets(orders, "order_date", fill="constant", total=Sum("cost"))
+    assert "A fill_value must be provided" in str(error_msg.value)
+
+
+@pytest.mark.django_db
+def test_pk_ranges(django_assert_num_queries):
+    """Make sure the primary keys of a model can be split into chunks using integer range series"""
+    instances = [ConcreteIntegerTest.objects.create(some_field=idx) for idx in range(0, 25)]
+    first_pk, last_pk = instances[0].pk, instances[-1].pk
+
+    with django_assert_num_queries(2):
+        pk_ranges = list(IntegerRangeTest.objects.pk_ranges(ConcreteIntegerTest, 10))
+    assert pk_ranges == [NumericRange(first_pk + idx, first_pk + idx + 10, "[)") for idx in (0, 10, 20)]
+    assert (
+        sum(
+            ConcreteIntegerTest.objects.filter(pk__gte=pk_range.lower, pk__lt=pk_range.upper).count()
+            for pk_range in pk_ranges
+        )
+        == 25
+    )
+
+    # Empty chunks are only skipped when requested
+    ConcreteIntegerTest.objects.filter(pk__gte=first_pk + 10, pk__lt=first_pk + 20).delete()
+    assert len(list(IntegerRangeTest.objects.pk_ranges(ConcreteIntegerTest.objects.all(), 10))) == 3
+    pk_ranges = list(IntegerRangeTest.objects.pk_ranges(ConcreteIntegerTest.objects.all(), 10, skip_empty=True))
+    assert pk_ranges == [NumericRange(first_pk, first_pk + 10, "[)"), NumericRange(first_pk + 20, first_pk + 30, "[)")]
+
+    single = IntegerRangeTest.objects.pk_ranges(ConcreteIntegerTest.objects.filter(pk=last_pk), 10)
+    assert list(single) == [NumericRange(last_pk, last_pk + 10, "[)")]
+    assert list(IntegerRangeTest.objects.pk_ranges(ConcreteIntegerTest.objects.none(), 10)) == []
+
+    # Arguments are validated when called, before iterating
+    with pytest.raises(ModelFieldNotSupported):
+        IntegerTest.objects.pk_ranges(ConcreteIntegerTest, 10)
+    with pytest.raises(ValueError):
+        IntegerRangeTest.objects.pk_ranges(ConcreteIntegerTest, 0)
+
+
+@pytest.mark.django_db
+def test_parallel(django_assert_num_queries):
+    """Make sure series can be evaluated in parallel chunks, with the same results as a single query"""
+    from django_generate_series.models import Params
+
+    integer_series = IntegerTest.objects.generate_series([0, 999, 3])
+    with django_assert_num_queries(0):
+        # Each chunk is run in a worker thread, with its own connection
+        results = list(integer_series.parallel(4))
+    assert results == list(integer_series)
+    assert list(integer_series.order_by("-id").parallel(4).values_list("id", flat=True)) == list(range(999, -1, -3))
+    assert integer_series.parallel(4).count() == 334
+    assert integer_series.parallel(4).aggregate(
+        Count("id"), total=Sum("id"), smallest=Min("id"), largest=Max("id"), average=Avg("id")
+    ) == integer_series.aggregate(
+        Count("id"), total=Sum("id"), smallest=Min("id"), largest=Max("id"), average=Avg("id")
+    )
+    assert list(IntegerTest.objects.generate_series([0, 2]).parallel(4)) == list(
+        IntegerTest.objects.generate_series([0, 2])
+    )
+
+    # Sliced querysets are evaluated with a single query
+    parallel_series = integer_series.order_by("id").parallel(4)
+    with django_assert_num_queries(5):
+        assert parallel_series.get(id=6).id == 6
+        assert parallel_series[3].id == 9
+        assert [item.id for item in parallel_series[2:4]] == [6, 9]
+        assert parallel_series.first().id == 0
+        assert parallel_series.last().id == 999
+
+    decimal_series = DecimalTest.objects.generate_series([0, 10, decimal.Decimal("0.25")])
+    assert list(decimal_series.parallel(3)) == list(decimal_series)
+
+    start = timezone.now().replace(microsecond=0)
+    datetime_series = DateTimeTest.objects.generate_series([start, start + timezone.timedelta(days=3), "90 minutes"])
+    assert list(datetime_series.parallel(4)) == list(datetime_series)
+
+    # Ranges without a width span consecutive values, so chunks share their boundaries
+    range_series = DateRangeTest.objects.generate_series(
+        [datetime.date(2022, 1, 1), datetime.date(2022, 3, 1), "1 weeks"]
+    )
+    assert list(range_series.parallel(4).values_list("id", flat=True)) == list(
+        range_series.values_list("id", flat=True)
+    )
+    width_series = IntegerRangeTest.objects.generate_series(Params(0, 100, 5, width=12))
+    assert list(width_series.parallel(4).values_list("id", flat=True)) == list(
+        width_series.values_list("id", flat=True)
+    )
+
+    with pytest.raises(ValueError):
+        list(
+            DateTest.objects.generate_series(
+                [datetime.date(2022, 1, 1), datetime.date(2023, 1, 1), "1 months"]
+            ).parallel()
+        )
+    with pytest.raises(ValueError):
+        list(integer_series.annotate_rolling(2, total=Sum("id")).parallel())
+    with pytest.raises(ValueError):
+        integer_series.parallel().aggregate(Count("id", distinct=True))
+
+
+@pytest.mark.django_db
+def test_generate_series_batch(django_assert_num_queries):
+    """Make sure several series can be generated with a single query"""
+    now = timezone.now().replace(microsecond=0)
+    params = {
+        "hourly": [now - timezone.timedelta(days=1), now, "1 hours"],
+        "daily": [now - timezone.timedelta(days=30), now, "1 days"],
+        "weekly": [now - timezone.timedelta(weeks=52), now, "1 weeks"],
+    }
+
+    with django_assert_num_queries(1):
+        batch = DateTimeTest.objects.generate_series_batch(params)
+    assert list(batch) == ["hourly", "daily", "weekly"]
+    for key, item in params.items():
+        assert [instance.id for instance in batch[key]] == [
+            instance.id for instance in DateTimeTest.objects.generate_series(item).order_by("id")
+        ]
+    assert not hasattr(batch["hourly"][0], "_series_key")
+
+    assert [len(results) for results in IntegerTest.objects.generate_series_batch([[0, 9], [5, 7], [0, 100, 10]])] == [
+        10,
+        3,
+        11,
+    ]
+    assert IntegerTest.objects.generate_series_batch([]) == []
+
+
+@pytest.mark.django_db
+def test_as_cte():
+    """Make sure the series can be generated once, in a WITH clause"""
+    series = IntegerTest.objects.generate_series([0, 9])
+    cte = series.as_cte()
+    assert str(cte.query).startswith('WITH "core_integertest_series" AS (SELECT generate_series(')
+    assert list(cte.order_by("id")) == list(series.order_by("id"))
+    assert cte.count() == 10
+    assert cte.filter(id__gte=5).aggregate(total=Sum("id")) == {"total": 35}
+
+    assert "AS MATERIALIZED (" in str(series.as_cte("numbers", materialized=True).query)
+    assert "AS NOT MATERIALIZED (" in str(series.as_cte("numbers", materialized=False).query)
+
+    # Other expressions of the query can refer to the CTE by name
+    numbers = series.as_cte("numbers").annotate(total=RawSQL('SELECT sum("id") FROM "numbers"', ()))
+    assert {item.total for item in numbers} == {45}
+
+    # Fills read the series again, so it is only generated once with a CTE
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((1, 10), (4, 40)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+    date_test = DateTest.objects.generate_series([start, start + timezone.timedelta(days=6), "1 days"])
+    linear = date_test.annotate_buckets(SimpleOrder.objects.all(), "order_date", fill="linear", largest=Max("cost"))
+    assert str(linear.query).count("generate_series(") == 2
+    assert str(linear.as_cte().query).count("generate_series(") == 1
+    assert [item.largest for item in linear.as_cte().order_by("id")] == [None, 10.0, 20.0, 30.0, 40.0, None, None]
+
+    range_series = DateTimeRangeTest.objects.generate_series(
+        [timezone.now() - timezone.timedelta(days=7), timezone.now(), "1 days"]
+    )
+    for days in (1, 2, 2, 5):
+        Event.objects.create(event_datetime=timezone.now() - timezone.timedelta(days=days, hours=1), ticket_qty=days)
+    events = Event.objects.all()
+    buckets = range_series.annotate_buckets(events, "event_datetime", event_count=Count("id"))
+    assert [item.event_count for item in buckets.as_cte().order_by("id")] == [
+        item.event_count for item in buckets.order_by("id")
+    ]
+
+
+@pytest.mark.django_db
+def test_annotate_top(django_assert_num_queries):
+    """Make sure the first rows of another model can be joined to each bucket with a LATERAL subquery"""
+    start = timezone.now().replace(microsecond=0) - timezone.timedelta(weeks=4)
+    for hours, ticket_qty in enumerate((5, 1, 9, 7, 3, 8, 2)):
+        # Two weeks of events, with more than 3 events in the first week
+        week = 0 if hours < 5 else 2
+        Event.objects.create(
+            event_datetime=start + timezone.timedelta(weeks=week, hours=hours + 1), ticket_qty=ticket_qty
+        )
+
+    weeks = DateTimeRangeTest.objects.generate_series([start, start + timezone.timedelta(weeks=4), "1 weeks"])
+    events = Event.objects.order_by("-ticket_qty")
+    top = weeks.annotate_top(events, "event_datetime", 3, rank="position", event_id="id", tickets="ticket_qty")
+    with django_assert_num_queries(1):
+        results = [(item.id.lower, item.position, item.tickets) for item in top.order_by("id", "position")]
+    assert results == [
+        (start, 1, 9),
+        (start, 2, 7),
+        (start, 3, 5),
+        (start + timezone.timedelta(weeks=2), 1, 8),
+        (start + timezone.timedelta(weeks=2), 2, 2),
+    ]
+    assert {item.event_id for item in top} == set(
+        Event.objects.filter(ticket_qty__in=(9, 7, 5, 8, 2)).values_list("id", flat=True)
+    )
+
+    # Buckets without rows can be kept
+    kept = weeks.annotate_top(events, "event_datetime", 1, keep_empty=True, tickets="ticket_qty")
+    assert [item.tickets for item in kept.order_by("id")] == [9, None, 8, None]
+
+    # Scalar series match rows with the same value
+    for value in (1, 1, 2, 5):
+        ConcreteIntegerTest.objects.create(some_field=value)
+    numbers = IntegerTest.objects.generate_series([0, 5]).annotate_top(
+        ConcreteIntegerTest.objects.order_by("-pk"), "some_field", 1, row_id="id"
+    )
+    assert [item.id for item in numbers.order_by("id")] == [1, 2, 5]
+
+    with pytest.raises(ValueError):
+        weeks.annotate_top(Event.objects.all(), "event_datetime", 3, tickets="ticket_qty")
+    with pytest.raises(ValueError):
+        weeks.annotate_top(events, "event_datetime", 0, tickets="ticket_qty")
+
+
+@pytest.mark.django_db
+def test_create_fixtures(django_assert_num_queries):
+    """Make sure concrete models can be filled with a single INSERT ... SELECT over a series"""
+    with django_assert_num_queries(1):
+        assert IntegerTest.objects.create_fixtures(ConcreteIntegerTest, 1000, some_field=F("id") * 2) == 1000
+    assert sorted(ConcreteIntegerTest.objects.values_list("some_field", flat=True)) == list(range(2, 2001, 2))
+
+    now = timezone.now()
+    span = timezone.timedelta(days=10)
+    IntegerTest.objects.create_fixtures(ConcreteDateTimeTest, 500, some_field=RandomDateTime(now, span))
+    bounds = ConcreteDateTimeTest.objects.aggregate(first=Min("some_field"), last=Max("some_field"))
+    assert now <= bounds["first"] < bounds["last"] < now + span
+
+    IntegerTest.objects.create_fixtures(ConcreteDateTest, 500, some_field=RandomDate(now, span))
+    dates = set(ConcreteDateTest.objects.values_list("some_field", flat=True))
+    assert 1 < len(dates) and all(now.date() <= value < (now + span).date() for value in dates)
+
+    # Fields with a default (Event.false_field) are filled too
+    IntegerTest.objects.create_fixtures(Event, 300, event_datetime=RandomDateTime(now), ticket_qty=RandomInteger(1, 3))
+    assert set(Event.objects.values_list("ticket_qty", flat=True)) == {1, 2, 3}
+    assert not Event.objects.filter(false_field=True).exists()
+
+    choices = [decimal.Decimal("1.50"), decimal.Decimal("2.25")]
+    IntegerTest.objects.create_fixtures(ConcreteDecimalTest, 100, some_field=RandomChoice(*choices))
+    assert set(ConcreteDecimalTest.objects.values_list("some_field", flat=True)) == set(choices)
+
+    assert IntegerTest.objects.create_fixtures(ConcreteIntegerTest, 1, some_field=5) == 1
+    assert IntegerTest.objects.create_fixtures(ConcreteIntegerTest, 0, some_field=5) == 0
+    with pytest.raises(ModelFieldNotSupported):
+        DateTest.objects.create_fixtures(ConcreteIntegerTest, 10, some_field=1)
+    with pytest.raises(ValueError):
+        RandomDateTime(now, timezone.timedelta(days=-1))
+
+
+@pytest.mark.django_db
+def test_insert_into(django_assert_num_queries):
+    """Make sure rows can be inserted from a series with a single INSERT ... SELECT"""
+    start = timezone.now().replace(minute=0, second=0, microsecond=0)
+    slots = DateTimeTest.objects.generate_series([start, start + timezone.timedelta(hours=7), "1 hours"])
+
+    with django_assert_num_queries(1):
+        assert (
+            slots.filter(id__lt=start + timezone.timedelta(hours=4)).insert_into(
+                BookingSlot, {"start_datetime": "id", "capacity": 4}
+            )
+            == 4
+        )
+
+    # Existing slots conflict with the unique start_datetime, and can be skipped
+    with pytest.raises(IntegrityError):
+        with transaction.atomic():
+            slots.insert_into(BookingSlot, {"start_datetime": "id"})
+    assert slots.insert_into(BookingSlot, {"start_datetime": "id"}, ignore_conflicts=True) == 4
+    assert list(BookingSlot.objects.order_by("start_datetime").values_list("start_datetime", "capacity")) == [
+        (start + timezone.timedelta(hours=hours), 4 if hours < 4 else 1) for hours in range(8)
+    ]
+
+    # Values can be expressions of the series fields and annotations
+    IntegerTest.objects.generate_series([1, 5]).annotate(double=F("id") * 2).insert_into(
+        ConcreteIntegerTest, {"some_field": F("double") + 1}
+    )
+    assert sorted(ConcreteIntegerTest.objects.values_list("some_field", flat=True)) == [3, 5, 7, 9, 11]
+
+    # auto_now and auto_now_add fields are set by the database, as they would be by save()
+    DateTest.objects.generate_series([datetime.date(2022, 1, 1), datetime.date(2022, 1, 3), "1 days"]).insert_into(
+        TrackedOrder, {"order_date": "id", "cost": 1}
+    )
+    assert TrackedOrder.objects.filter(updated_at__lte=timezone.now()).count() == 3
+
+    # A callable default is evaluated once, so it cannot fill a unique field, nor a primary key other than an AutoField
+    tickets = IntegerTest.objects.generate_series([1, 3])
+    uuids = {name: RawSQL(f"md5('{name}' || id::text)::uuid", ()) for name in ("id", "code")}
+    with pytest.raises(ValueError) as error_msg:
+        tickets.insert_into(Ticket, {"code": uuids["code"]})
+    assert "core.Ticket.id is unique" in str(error_msg.value)
+    with pytest.raises(ValueError) as error_msg:
+        tickets.insert_into(Ticket, {"id": uuids["id"]})
+    assert "core.Ticket.code is unique" in str(error_msg.value)
+    assert tickets.insert_into(Ticket, uuids) == 3
+    assert Ticket.objects.filter(issued_at__lte=timezone.now()).values("code").distinct().count() == 3
+
+
+@pytest.mark.django_db
+def test_insert_into_update_conflicts(django_assert_num_queries):
+    """Make sure rollup tables can be upserted from a gap-filled aggregation of a series"""
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((0, 10), (2, 20), (2, 5), (5, 7)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    def refresh(first_day: int, last_day: int) -> int:
+        days = DateTest.objects.generate_series(
+            [start + timezone.timedelta(days=first_day), start + timezone.timedelta(days=last_day), "1 days"]
+        ).annotate_buckets(
+            SimpleOrder.objects.all(),
+            "order_date",
+            fill="constant",
+            fill_value=0,
+            order_count=Count("id"),
+            total_cost=Sum("cost"),
+        )
+        return days.insert_into(
+            DailyOrderRollup,
+            {"day": "id", "order_count": "order_count", "total_cost": "total_cost"},
+            update_conflicts=True,
+            unique_fields=["day"],
+        )
+
+    def rollup():
+        return list(DailyOrderRollup.objects.order_by("day").values_list("order_count", "total_cost"))
+
+    with django_assert_num_queries(1):
+        assert refresh(0, 6) == 7
+    assert rollup() == [(1, 10), (0, 0), (2, 25), (0, 0), (0, 0), (1, 7), (0, 0)]
+
+    # Only the buckets of the series are refreshed, and unchanged rows are not rewritten
+    SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=3), cost=3)
+    SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=6), cost=4)
+    assert refresh(2, 4) == 1
+    assert rollup() == [(1, 10), (0, 0), (2, 25), (1, 3), (0, 0), (1, 7), (0, 0)]
+
+    with pytest.raises(ValueError):
+        DateTest.objects.generate_series([start, start + timezone.timedelta(days=1), "1 days"]).insert_into(
+            DailyOrderRollup, {"day": "id", "order_count": 0, "total_cost": 0}, update_conflicts=True
+        )
+    with pytest.raises(ValueError):
+        DateTest.objects.generate_series([start, start + timezone.timedelta(days=1), "1 days"]).insert_into(
+            DailyOrderRollup,
+            {"day": "id", "order_count": 0, "total_cost": 0},
+            ignore_conflicts=True,
+            update_conflicts=True,
+            unique_fields=["day"],
+        )
+
+
+def test_local_sequences():
+    """Make sure the local module produces the same sequences as sequence_utils"""
+    numpy = pytest.importorskip("numpy")
+    from django_generate_series import local
+
+    start = timezone.now()
+    for kwargs in (
+        {"end_datetime": start + timezone.timedelta(days=10, hours=1)},
+        {"num_steps": 7},
+        {"step": timezone.timedelta(hours=5), "num_steps": 30},
+    ):
+        expected = list(get_datetime_sequence(start, **kwargs))
+        assert list(local.get_datetime_sequence(start, **kwargs)) == expected
+        assert list(local.get_date_sequence(start, **kwargs)) == list(get_date_sequence(start, **kwargs))
+        assert list(local.datetime_array(start, **kwargs).astype(object)) == [
+            value.replace(tzinfo=None) for value in expected
+        ]
+        assert local.date_array(start, **kwargs).dtype == numpy.dtype("datetime64[D]")
+
+    step = timezone.timedelta(hours=6)
+    assert list(local.get_datetime_range_sequence(start, step, num_steps=3)) == [
+        (start + step * index, start + step * (index + 1)) for index in range(3)
+    ]
+    assert local.datetime_range_array(start, step, num_steps=3).astype(object).tolist() == [
+        [(start + step * index).replace(tzinfo=None), (start + step * (index + 1)).replace(tzinfo=None)]
+        for index in range(3)
+    ]
+    day = timezone.timedelta(days=1)
+    assert local.date_range_array(start, day, num_steps=2).astype(object).tolist() == [
+        list(item) for item in local.get_date_range_sequence(start, day, num_steps=2)
+    ]
+
+    # Across a DST change, steps keep their length in UTC, whereas sequence_utils adds them to the wall time
+    paris = dateutil.tz.gettz("Europe/Paris")
+    before_dst = datetime.datetime(2022, 3, 26, 12, tzinfo=paris)
+    assert [value.hour for value in get_datetime_sequence(before_dst, day, num_steps=3)] == [12, 12, 12]
+    assert [value.hour for value in local.get_datetime_sequence(before_dst, day, num_steps=3)] == [12, 13, 13]
+    assert list(local.datetime_array(before_dst, day, num_steps=3).astype(object)) == [
+        datetime.datetime(2022, 3, number, 11) for number in (26, 27, 28)
+    ]
+
+    for kwargs in (
+        {"end": decimal.Decimal("10.5")},
+        {"step": decimal.Decimal("0.25"), "num_steps": 9},
+        {"step": 2, "end": decimal.Decimal("9")},
+    ):
+        expected = list(get_decimal_sequence(**kwargs))
+        assert [str(value) for value in local.get_decimal_sequence(**kwargs)] == [str(value) for value in expected]
+        assert local.decimal_array(**kwargs).to_decimals() == expected
+
+    scaled = local.decimal_array(decimal.Decimal("1.5"), decimal.Decimal("0.25"), num_steps=3)
+    assert scaled.places == 2 and list(scaled.values) == [150, 175, 200]
+    assert list(local.get_decimal_range_sequence(decimal.Decimal("1.5"), decimal.Decimal("0.5"), num_steps=2)) == [
+        (decimal.Decimal("1.5"), decimal.Decimal("2.0")),
+        (decimal.Decimal("2.0"), decimal.Decimal("2.5")),
+    ]
+    ranges = local.decimal_range_array(decimal.Decimal("1.5"), decimal.Decimal("0.5"), num_steps=2)
+    assert ranges.places == 1 and ranges.values.tolist() == [[15, 20], [20, 25]]
+    assert ranges.to_decimals() == list(
+        local.get_decimal_range_sequence(decimal.Decimal("1.5"), decimal.Decimal("0.5"), num_steps=2)
+    )
+
+    with pytest.raises(ValueError):
+        local.datetime_array(start, end_datetime=start - timezone.timedelta(days=1))
+    with pytest.raises(ValueError):
+        list(local.get_decimal_sequence(step=decimal.Decimal("0")))
+
+
+@pytest.mark.django_db
+def test_interval_objects():
+    """Make sure timedeltas and relativedeltas can be used as interval steps and widths"""
+    relativedelta = pytest.importorskip("dateutil.relativedelta").relativedelta
+    from django_generate_series.models import Params
+
+    start = timezone.now().replace(microsecond=0)
+    stop = start + timezone.timedelta(days=2)
+
+    def ids(queryset):
+        return list(queryset.order_by("id").values_list("id", flat=True))
+
+    expected = ids(DateTimeTest.objects.generate_series([start, stop, "6 hours"]))
+    assert ids(DateTimeTest.objects.generate_series([start, stop, timezone.timedelta(hours=6)])) == expected
+    assert ids(DateTimeTest.objects.generate_series([start, stop, relativedelta(hours=6)])) == expected
+
+    first, last = datetime.date(2022, 1, 31), datetime.date(2022, 12, 31)
+    assert ids(DateTest.objects.generate_series([first, last, relativedelta(months=1)])) == ids(
+        DateTest.objects.generate_series([first, last, "1 months"])
+    )
+    bounds = [
+        datetime.date(2022, 1, 31),
+        datetime.date(2022, 5, 1),
+        datetime.date(2022, 8, 2),
+        datetime.date(2022, 11, 3),
+    ]
+    assert ids(DateRangeTest.objects.generate_series([first, last, relativedelta(months=3, days=1)])) == [
+        DateRange(lower, upper, "[)") for lower, upper in zip(bounds, bounds[1:])
+    ]
+
+    width_series = DateTimeRangeTest.objects.generate_series(
+        Params(start, stop, timezone.timedelta(days=1), width=timezone.timedelta(hours=36))
+    )
+    assert [(item.lower, item.upper) for item in ids(width_series)] == [
+        (start + timezone.timedelta(days=days), start + timezone.timedelta(days=days, hours=36)) for days in range(3)
+    ]
+
+    # Fixed-length intervals can be split for parallel evaluation
+    series = DateTimeTest.objects.generate_series([start, stop, timezone.timedelta(minutes=90)])
+    assert list(series.parallel(3)) == list(series)
+
+    with pytest.raises(ValueError):
+        list(DateTest.objects.generate_series([first, last, relativedelta(month=1)]))
+    with pytest.raises(ValueError):
+        list(
+            DateTimeRangeTest.objects.generate_series(
+                Params(start, stop, timezone.timedelta(days=1), width=timezone.timedelta(0))
+            )
+        )
+
+
+@pytest.mark.django_db
+def test_cached(django_assert_num_queries):
+    """Make sure evaluated series can be cached, and are invalidated when the models they read are changed"""
+    from django.core.cache import cache
+
+    cache.clear()
+    start = datetime.date(2022, 1, 1)
+    order = SimpleOrder.objects.create(order_date=start, cost=10)
+
+    def daily_costs():
+        return (
+            DateTest.objects.generate_series([start, start + timezone.timedelta(days=2), "1 days"])
+            .annotate_buckets(SimpleOrder.objects.all(), "order_date", total=Sum("cost"))
+            .order_by("id")
+            .cached(60)
+        )
+
+    with django_assert_num_queries(1):
+        assert [item.total for item in daily_costs()] == [10, None, None]
+        assert [item.total for item in daily_costs()] == [10, None, None]
+    assert list(daily_costs().values_list("total", flat=True)) == [10, None, None]
+
+    # Other models do not invalidate the results
+    Event.objects.create(event_datetime=timezone.now(), ticket_qty=1)
+    with django_assert_num_queries(0):
+        list(daily_costs())
+
+    SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=1), cost=5)
+    with django_assert_num_queries(1):
+        assert [item.total for item in daily_costs()] == [10, 5, None]
+    order.delete()
+    assert [item.total for item in daily_costs()] == [None, 5, None]
+
+    # Models of subqueries in annotations are read too
+    orders = SimpleOrder.objects.filter(order_date=OuterRef("id")).values("order_date").annotate(count=Count("id"))
+    counts = (
+        DateTest.objects.generate_series([start, start + timezone.timedelta(days=2), "1 days"])
+        .annotate(orders=Subquery(orders.values("count")[:1]))
+        .order_by("id")
+        .cached()
+    )
+    assert [item.orders for item in counts] == [None, 1, None]
+    SimpleOrder.objects.create(order_date=start, cost=1)
+    with django_assert_num_queries(1):
+        assert [item.orders for item in counts.all()] == [1, 1, None]
+
+
+@pytest.mark.django_db
+def test_cached_invalidation():
+    """Make sure versions are changed without a prior cached read, and that unconfigured caches are refused"""
+    from django.core.cache import cache
+
+    # Event is not read by any cached series in this process
+    key = _get_version_key(Event)
+    cache.set(key, 1, None)
+    Event.objects.create(event_datetime=timezone.now(), ticket_qty=1)
+    assert cache.get(key) == 2
+    Event.objects.all().delete()
+    assert cache.get(key) == 3
+
+    with pytest.raises(ImproperlyConfigured):
+        list(IntegerTest.objects.generate_series([0, 10]).cached(using="other"))
+
+    # Models missing from GENERATE_SERIES_CACHED_MODELS are not watched, and cannot be read by cached series
+    ConcreteIntegerTest.objects.create(some_field=1)
+    assert cache.get(_get_version_key(ConcreteIntegerTest)) is None
+    counts = IntegerTest.objects.generate_series([0, 10]).annotate(
+        rows=Subquery(ConcreteIntegerTest.objects.filter(some_field=OuterRef("id")).values("some_field")[:1])
+    )
+    with pytest.raises(ImproperlyConfigured):
+        list(counts.cached())
+
+    # Without the setting, no receiver is connected, and no model is watched
+    try:
+        with override_settings(GENERATE_SERIES_CACHED_MODELS=None):
+            connect_receivers()
+            with pytest.raises(ImproperlyConfigured):
+                list(
+                    IntegerTest.objects.generate_series([0, 10])
+                    .annotate_buckets(Event.objects.all(), "ticket_qty", events=Count("id"))
+                    .cached()
+                )
+    finally:
+        connect_receivers()
+
+
+@pytest.mark.django_db
+def test_annotate_histogram(django_assert_num_queries):
+    """Make sure histograms can be computed with width_bucket, using the series values as bucket edges"""
+    costs = [0, 5, 10, 12, 19, 25, 49, 50, 75, -1]
+    for cost in costs:
+        SimpleOrder.objects.create(order_date=datetime.date(2022, 1, 1), cost=cost)
+    orders = SimpleOrder.objects.all()
+
+    histogram = IntegerTest.objects.generate_series([0, 50, 10]).annotate_histogram(
+        orders, "cost", fill_value=0, order_count=Count("id"), largest=Max("cost")
+    )
+    with django_assert_num_queries(1):
+        results = [(item.id, item.order_count, item.largest) for item in histogram.order_by("id")]
+    # Costs below the first edge, or at least the last edge, are not counted
+    assert results == [(0, 2, 5), (10, 3, 19), (20, 1, 25), (30, 0, 0), (40, 1, 49), (50, 0, 0)]
+
+    # The edges are those of the generated series, whether the series is filtered before or after
+    filtered = [(0, 2, 5), (20, 1, 25), (50, 0, 0)]
+    assert [
+        (item.id, item.order_count, item.largest) for item in histogram.filter(id__in=[0, 20, 50]).order_by("id")
+    ] == filtered
+    edges = IntegerTest.objects.generate_series([0, 50, 10]).filter(id__in=[0, 20, 50])
+    counts = edges.annotate_histogram(orders, "cost", fill_value=0, order_count=Count("id"), largest=Max("cost"))
+    assert [(item.id, item.order_count, item.largest) for item in counts.order_by("id")] == filtered
+
+    # Earlier joins are not repeated within the edges
+    bucketed = IntegerTest.objects.generate_series([0, 50, 10]).annotate_buckets(orders, "cost", exact=Count("id"))
+    counts = bucketed.annotate_histogram(orders, "cost", order_count=Count("id")).order_by("id")
+    assert str(counts.query).count("LEFT JOIN") == 2
+    assert [(item.id, item.exact, item.order_count) for item in counts][:3] == [(0, 1, 2), (10, 1, 3), (20, 0, 1)]
+
+    # Values are compared with the edges as plain numerics, without rounding them to the type of the series
+    just_below = ExpressionWrapper(F("cost") - 0.4, output_field=models.FloatField())
+    counts = IntegerTest.objects.generate_series([0, 50, 10]).annotate_histogram(orders, just_below, n=Count("id"))
+    assert [item.n for item in counts.order_by("id")] == [2, 2, 1, None, 2, None]
+
+    # Integer costs are compared with decimal edges, and values beyond their precision are left out
+    SimpleOrder.objects.create(order_date=datetime.date(2022, 1, 1), cost=2_000_000_000)
+    decimal_edges = DecimalTest.objects.generate_series([0, 100, decimal.Decimal("25.00")])
+    counts = decimal_edges.annotate_histogram(orders, "cost", order_count=Count("id")).order_by("id")
+    assert [item.order_count for item in counts] == [5, 2, 1, 1, None]
+
+    with pytest.raises(ModelFieldNotSupported):
+        DateTest.objects.generate_series(
+            [datetime.date(2022, 1, 1), datetime.date(2022, 2, 1), "1 days"]
+        ).annotate_histogram(orders, "cost", order_count=Count("id"))
+
+
+@pytest.mark.django_db
+def test_ordered_set_aggregates(django_assert_num_queries):
+    """Make sure percentiles and modes can be computed per bucket"""
+    start = datetime.date(2022, 1, 1)
+    SimpleOrder.objects.bulk_create(SimpleOrder(order_date=start, cost=cost) for cost in range(1, 101))
+    for cost in (3, 5, 3):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=1), cost=cost)
+
+    date_test = DateTest.objects.generate_series([start, start + timezone.timedelta(days=2), "1 days"])
+    annotated = date_test.annotate_buckets(
+        SimpleOrder.objects.all(),
+        "order_date",
+        p50=PercentileCont("cost", 0.5),
+        p95=PercentileDisc("cost", 0.95),
+        most_common=Mode("cost"),
+        large_p50=PercentileDisc("cost", 0.5, filter=models.Q(cost__gt=4)),
+    ).order_by("id")
+    with django_assert_num_queries(1):
+        results = [(item.p50, item.p95, item.most_common, item.large_p50) for item in annotated]
+    assert results == [(50.5, 95, 1, 52), (3.0, 5, 3, 5), (None, None, None, None)]
+
+    histogram = IntegerTest.objects.generate_series([0, 100, 50]).annotate_histogram(
+        SimpleOrder.objects.all(), "cost", median=PercentileDisc("cost", 0.5)
+    )
+    assert [item.median for item in histogram.order_by("id")] == [23, 74, None]
+
+    # Partial results cannot be combined into running totals, or across chunks of the series
+    with pytest.raises(ValueError):
+        date_test.annotate_buckets(
+            SimpleOrder.objects.all(), "order_date", cumulative=True, p50=PercentileCont("cost", 0.5)
+        )
+    with pytest.raises(ValueError):
+        date_test.parallel(2).aggregate(p50=PercentileCont("id", 0.5))
+    with pytest.raises(ValueError):
+        PercentileCont("cost", 95)
+
+
+@pytest.mark.django_db
+def test_business_days(django_assert_num_queries):
+    """Make sure weekends and holidays can be left out of date series in the database"""
+    # 2022-01-03 is a Monday
+    start, end = datetime.date(2022, 1, 3), datetime.date(2022, 1, 16)
+    date_test = DateTest.objects.generate_series([start, end, "1 days"])
+
+    with django_assert_num_queries(1):
+        days = [item.id for item in date_test.business_days().order_by("id")]
+    assert [day.isoweekday() for day in days] == [1, 2, 3, 4, 5] * 2
+
+    holidays = [datetime.date(2022, 1, 6), datetime.date(2022, 1, 8)]
+    days = date_test.business_days(exclude_weekdays=[7], holidays=holidays).order_by("id")
+    assert [item.id.day for item in days] == [3, 4, 5, 7, 10, 11, 12, 13, 14, 15]
+
+    # Holidays can be anti-joined from a QuerySet, and the buckets only see business days
+    SimpleOrder.objects.create(order_date=datetime.date(2022, 1, 4), cost=1)
+    for day, cost in ((3, 10), (5, 20), (9, 30)):
+        SimpleOrder.objects.create(order_date=datetime.date(2022, 1, day), cost=cost)
+    orders = SimpleOrder.objects.filter(cost=1).values_list("order_date", flat=True)
+    annotated = (
+        date_test.business_days(holidays=orders)
+        .annotate_buckets(SimpleOrder.objects.all(), "order_date", fill="locf", total=Sum("cost"))
+        .order_by("id")
+    )
+    # The order of Sunday the 9th is not carried forward
+    results = [(item.id.day, item.total) for item in annotated]
+    assert results == [(3, 10), (5, 20), (6, 20), (7, 20), (10, 20), (11, 20), (12, 20), (13, 20), (14, 20)]
+    assert date_test.business_days(holidays=holidays).parallel(2).count() == 9
+
+    with pytest.raises(ValueError):
+        date_test.business_days(exclude_weekdays=[0])
+    with pytest.raises(ValueError):
+        date_test.business_days(holidays=SimpleOrder.objects.all())
+    with pytest.raises(ModelFieldNotSupported):
+        IntegerTest.objects.generate_series([0, 10]).business_days()
+
+
+@pytest.mark.django_db
+def test_generate_recurrence(django_assert_num_queries):
+    """Make sure recurrence slots are generated in the database, following daylight saving time"""
+    utc = datetime.timezone.utc
+    # Daylight saving time starts on 2022-03-27 in Paris, moving from UTC+1 to UTC+2
+    start = datetime.datetime(2022, 3, 20, 23, tzinfo=utc)
+    stop = datetime.datetime(2022, 4, 4, 7, tzinfo=utc)
+    times = [datetime.time(14), datetime.time(9)]
+
+    slots = DateTimeTest.objects.generate_recurrence(
+        start, stop, weekdays=[4, 1], times=times, timezone="Europe/Paris"
+    )
+    with django_assert_num_queries(1):
+        results = [item.id for item in slots.order_by("id")]
+    expected = [
+        datetime.datetime(2022, 3, day, hour - offset, tzinfo=utc)
+        for day, offset in ((21, 1), (24, 1), (28, 2), (31, 2))
+        for hour in (9, 14)
+    ]
+    assert results == expected
+
+    # Slots at or after stop are left out, including those of partial days split in parallel
+    assert slots.parallel(3).count() == 8
+    every_day = DateTimeTest.objects.generate_recurrence(start, stop, timezone="Europe/Paris")
+    assert every_day.count() == 15
+    assert every_day.parallel(4).count() == 15
+
+    # Slots can be inserted into other models without being expanded in Python
+    assert slots.insert_into(BookingSlot, {"start_datetime": "id"}) == 8
+    assert list(BookingSlot.objects.order_by("start_datetime").values_list("start_datetime", flat=True)) == expected
+
+    with pytest.raises(ValueError):
+        DateTimeTest.objects.generate_recurrence(start, stop, weekdays=[8])
+    with pytest.raises(ValueError):
+        DateTimeTest.objects.generate_recurrence(start, stop, times=[])
+    with pytest.raises(ModelFieldNotSupported):
+        DateTest.objects.generate_recurrence(start, stop)
+
+
+@pytest.mark.django_db
+def test_rollup(django_assert_num_queries):
+    """Make sure facts can be rolled up to several granularities with a single query"""
+    start = datetime.date(2022, 1, 30)
+    for day, cost in ((0, 10), (0, 20), (1, 5), (2, 7), (8, 1)):
+        SimpleOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    date_test = DateTest.objects.generate_series([start, start + timezone.timedelta(days=9), "1 days"])
+    with django_assert_num_queries(1):
+        results = date_test.rollup(
+            SimpleOrder.objects.all(),
+            "order_date",
+            levels=["week", "month"],
+            orders=Count("id"),
+            total=Sum("cost"),
+            largest=Max("cost"),
+            average=Avg("cost"),
+        )
+    # 2022-01-30 is a Sunday, so the week of 2022-01-24 only includes it
+    assert results == [
+        {"level": "week", "id": datetime.date(2022, 1, 24), "orders": 2, "total": 30, "largest": 20, "average": 15},
+        {"level": "week", "id": datetime.date(2022, 1, 31), "orders": 2, "total": 12, "largest": 7, "average": 6},
+        {"level": "week", "id": datetime.date(2022, 2, 7), "orders": 1, "total": 1, "largest": 1, "average": 1},
+        {
+            "level": "month",
+            "id": datetime.date(2022, 1, 1),
+            "orders": 3,
+            "total": 35,
+            "largest": 20,
+            "average": 35 / 3,
+        },
+        {"level": "month", "id": datetime.date(2022, 2, 1), "orders": 2, "total": 8, "largest": 7, "average": 4},
+    ]
+
+    days = date_test.rollup(SimpleOrder.objects.all(), "order_date", levels=["day"], total=Sum("cost"))
+    assert [(item["id"].day, item["total"]) for item in days[:4]] == [(30, 30), (31, 5), (1, 7), (2, None)]
+
+    # Datetime series can also be rolled up from hours, with facts truncated to the hour
+    utc = datetime.timezone.utc
+    for hours, ticket_qty in ((1, 1), (2, 2), (25, 3)):
+        Event.objects.create(
+            event_datetime=datetime.datetime(2022, 1, 1, tzinfo=utc) + timezone.timedelta(hours=hours),
+            ticket_qty=ticket_qty,
+        )
+    hour_test = DateTimeTest.objects.generate_series(
+        [datetime.datetime(2022, 1, 1, tzinfo=utc), datetime.datetime(2022, 1, 2, 23, tzinfo=utc), "1 hours"]
+    )
+    results = hour_test.rollup(
+        Event.objects.all(), "event_datetime", levels=["hour", "day"], tickets=Sum("ticket_qty")
+    )
+    assert len(results) == 50
+    assert results[-2:] == [
+        {"level": "day", "id": datetime.datetime(2022, 1, 1, tzinfo=utc), "tickets": 3},
+        {"level": "day", "id": datetime.datetime(2022, 1, 2, tzinfo=utc), "tickets": 3},
+    ]
+
+    # Days start at midnight in the current timezone (05:00 UTC in New York), as with Trunc
+    with timezone.override("America/New_York"):
+        results = hour_test.rollup(Event.objects.all(), "event_datetime", levels=["day"], tickets=Sum("ticket_qty"))
+    assert results == [
+        {"level": "day", "id": datetime.datetime(2021, 12, 31, 5, tzinfo=utc), "tickets": 3},
+        {"level": "day", "id": datetime.datetime(2022, 1, 1, 5, tzinfo=utc), "tickets": 3},
+        {"level": "day", "id": datetime.datetime(2022, 1, 2, 5, tzinfo=utc), "tickets": None},
+    ]
+
+    # Sums which do not fit the type of the summed field are returned as they are
+    SimpleOrder.objects.bulk_create(SimpleOrder(order_date=start, cost=2_000_000_000) for _ in range(2))
+    months = date_test.rollup(SimpleOrder.objects.all(), "order_date", levels=["month"], total=Sum("cost"))
+    assert months[0]["total"] == 4_000_000_035 and isinstance(months[0]["total"], int)
+
+    with pytest.raises(ValueError):
+        date_test.rollup(SimpleOrder.objects.all(), "order_date", levels=["hour"], total=Sum("cost"))
+    with pytest.raises(ValueError):
+        date_test.rollup(SimpleOrder.objects.all(), "order_date", total=Sum("cost", distinct=True))
+
+
+@pytest.mark.django_db
+def test_refresh_buckets(django_assert_num_queries):
+    """Make sure buckets are stored, and only recomputed from the watermark or when their rows are updated"""
+    start = datetime.date(2022, 1, 1)
+    for day, cost in ((0, 10), (1, 5), (1, 7), (3, 1)):
+        TrackedOrder.objects.create(order_date=start + timezone.timedelta(days=day), cost=cost)
+
+    def refresh(date_test):
+        return date_test.refresh_buckets(
+            DailyOrderRollup,
+            "day",
+            TrackedOrder.objects.all(),
+            "order_date",
+            updated_at="updated_at",
+            fill_value=0,
+            order_count=Count("id"),
+            total_cost=Sum("cost"),
+        )
+
+    def stored():
+        return list(DailyOrderRollup.objects.order_by("day").values_list("day", "order_count", "total_cost"))
+
+    # Every bucket is computed when the table is empty
+    past = DateTest.objects.generate_series([start, start + timezone.timedelta(days=3), "1 days"])
+    with django_assert_num_queries(2):
+        assert refresh(past) == 4
+    assert stored() == [
+        (start, 1, 10),
+        (start + timezone.timedelta(days=1), 2, 12),
+        (start + timezone.timedelta(days=2), 0, 0),
+        (start + timezone.timedelta(days=3), 1, 1),
+    ]
+
+    # Only the latest bucket is recomputed, and older buckets are left untouched, even if their rows are changed
+    #   without updating updated_at
+    TrackedOrder.objects.filter(cost=10).update(cost=20, updated_at=timezone.now() - timezone.timedelta(days=1))
+    TrackedOrder.objects.create(order_date=start + timezone.timedelta(days=3), cost=2)
+    assert refresh(past) == 1
+    assert stored()[0] == (start, 1, 10)
+    assert stored()[3] == (start + timezone.timedelta(days=3), 2, 3)
+
+    # Rows updated since the last refresh have their buckets recomputed
+    order = TrackedOrder.objects.get(cost=5)
+    order.cost = 50
+    order.save()
+    assert refresh(past) == 2
+    assert stored() == [
+        (start, 1, 10),
+        (start + timezone.timedelta(days=1), 2, 57),
+        (start + timezone.timedelta(days=2), 0, 0),
+        (start + timezone.timedelta(days=3), 2, 3),
+    ]
+
+    # Older buckets missing from the table are computed, whether deleted or before the start of earlier series
+    DailyOrderRollup.objects.filter(day=start).delete()
+    assert refresh(past) == 2
+    assert stored()[0] == (start, 1, 20)
+    TrackedOrder.objects.create(order_date=start - timezone.timedelta(days=3), cost=6)
+    extended = DateTest.objects.generate_series([start - timezone.timedelta(days=5), start, "1 days"])
+    assert refresh(extended) == 5
+    assert stored()[:6] == [
+        (start - timezone.timedelta(days=5), 0, 0),
+        (start - timezone.timedelta(days=4), 0, 0),
+        (start - timezone.timedelta(days=3), 1, 6),
+        (start - timezone.timedelta(days=2), 0, 0),
+        (start - timezone.timedelta(days=1), 0, 0),
+        (start, 1, 20),
+    ]
+
+    # Buckets after the current time are recomputed until they have started
+    DailyOrderRollup.objects.all().delete()
+    today = timezone.localdate()
+    TrackedOrder.objects.create(order_date=today - timezone.timedelta(days=1), cost=4)
+    upcoming = DateTest.objects.generate_series(
+        [today - timezone.timedelta(days=2), today + timezone.timedelta(days=3), "1 days"]
+    )
+    assert refresh(upcoming) == 6
+    TrackedOrder.objects.create(order_date=today, cost=3)
+    assert refresh(upcoming) == 4
+    assert stored() == [
+        (today - timezone.timedelta(days=2), 0, 0),
+        (today - timezone.timedelta(days=1), 1, 4),
+        (today, 1, 3),
+        (today + timezone.timedelta(days=1), 0, 0),
+        (today + timezone.timedelta(days=2), 0, 0),
+        (today + timezone.timedelta(days=3), 0, 0),
+    ]
+
+    with pytest.raises(ModelFieldNotSupported):
+        IntegerTest.objects.generate_series([0, 10]).refresh_buckets(
+            DailyOrderRollup, "day", TrackedOrder.objects.all(), "order_date", order_count=Count("id")
+        )
+
+
+@pytest.mark.django_db
+def test_series_view():
+    """Make sure series aggregations can be stored in materialized views, and refreshed concurrently"""
+    assert DailyOrderView.objects.count() == 7
+    assert DailyOrderView.objects.filter(order_count__gt=0).count() == 0
+
+    for day, cost in ((0, 10), (0, 5), (2, 7)):
+        SimpleOrder.objects.create(order_date=datetime.date(2022, 1, 1) + timezone.timedelta(days=day), cost=cost)
+    # The view is only updated when it is refreshed
+    assert DailyOrderView.objects.filter(order_count__gt=0).count() == 0
+
+    out = StringIO()
+    call_command("refresh_series_views", "core.DailyOrderView", stdout=out)
+    assert out.getvalue() == "Refreshed core.DailyOrderView\n"
+    results = DailyOrderView.objects.order_by("day").values_list("day", "order_count", "total_cost")
+    assert list(results[:3]) == [
+        (datetime.date(2022, 1, 1), 2, 15),
+        (datetime.date(2022, 1, 2), 0, 0),
+        (datetime.date(2022, 1, 3), 1, 7),
+    ]
+
+    SimpleOrder.objects.create(order_date=datetime.date(2022, 1, 2), cost=1)
+    DailyOrderView.refresh(concurrently=False)
+    assert DailyOrderView.objects.get(day=datetime.date(2022, 1, 2)).total_cost == 1
+
+    # The view is read-only
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        DailyOrderView.objects.all().delete()
+        DailyOrderView.objects.get(day=datetime.date(2022, 1, 1)).save()
+    assert len(caught) == 2
+    assert DailyOrderView.objects.count() == 7
+
+    with pytest.raises(CommandError):
+        call_command("refresh_series_views", "core.SimpleOrder")
+
+
+@pytest.mark.django_db
+def test_series_view_migration():
+    """Make sure CreateSeriesView migrations are snapshots of the view, which restore the previous one when reversed"""
+    loader = MigrationLoader(connection)
+    created = loader.get_migration("core", "0005_dailyorderview").operations[-1]
+    name, args, kwargs = created.deconstruct()
+    assert CreateSeriesView(*args, **kwargs).deconstruct() == (name, args, kwargs)
+
+    state = loader.project_state()
+    recreated = CreateSeriesView(
+        "core.DailyOrderView",
+        'SELECT %s AS "order_count", %s AS "total_cost", %s::date AS "day"',
+        (1, 2, datetime.date(2022, 2, 1)),
+        previous_sql=created.sql,
+        previous_params=created.params,
+    )
+    with connection.schema_editor() as editor:
+        recreated.database_forwards("core", editor, state, state)
+    assert list(DailyOrderView.objects.values_list("day", "order_count", "total_cost")) == [
+        (datetime.date(2022, 2, 1), 1, 2)
+    ]
+    with connection.schema_editor() as editor:
+        recreated.database_backwards("core", editor, state, state)
+    assert DailyOrderView.objects.count() == 7
+
+    # The command writes the next migration, which restores the latest definition when reversed
+    out = StringIO()
+    call_command("make_series_view_migration", "core.DailyOrderView", stdout=out)
+    path = out.getvalue().split(" ", 1)[1].strip()
+    try:
+        assert path.endswith("0008_create_series_view_dailyorderview.py")
+        with open(path) as file:
+            migration = file.read()
+        assert "0007_ticket" in migration
+        assert "previous_sql=" in migration
+    finally:
+        os.remove(path)
+
+    with pytest.raises(CommandError):
+        call_command("make_series_view_migration", "core.SimpleOrder")
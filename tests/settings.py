@@ -132,6 +132,8 @@ CACHES = {
     }
 }
 
+GENERATE_SERIES_CACHED_MODELS = ["core.SimpleOrder", "core.Event"]
+
 
 LOGGING = {
     "version": 1,